@@ -1,6 +1,6 @@
 # achievement_ui.py - 修复图标显示和进度刷新问题
 import pygame
-from ui import show_text, draw_button
+from ui import show_text, draw_button, get_font
 from achievements import achievement_system
 
 
@@ -59,7 +59,7 @@ class AchievementUI:
         # 绘制图标文字 - 确保使用正确的字体
         try:
             # 尝试使用支持emoji的字体
-            icon_font = pygame.font.SysFont("segoeuiemoji", 16)
+            icon_font = get_font(16, "segoeuiemoji")
             icon_surface = icon_font.render(definition["icon"], True, self.colors["text_primary"])
             icon_text_rect = icon_surface.get_rect(center=icon_rect.center)
             self.screen.blit(icon_surface, icon_text_rect)
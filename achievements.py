@@ -1,8 +1,21 @@
 # achievements.py - 修复数据读取和进度计算问题
 import json
 import os
+import time
 from datetime import datetime
-from score_manage import get_rankings  # 导入排行榜数据读取
+import numpy as np
+from score_manage import get_score_columns, longest_run  # 导入分数库的列数据
+import persistence
+
+
+def local_hours(epochs: np.ndarray) -> np.ndarray:
+    """时间戳对应的本地小时（0~23）"""
+    if not len(epochs):
+        return np.zeros(0, dtype=np.int64)
+    if not time.daylight:
+        # 没有夏令时的时区：整列加固定偏移即可
+        return (epochs - time.timezone) // 3600 % 24
+    return np.array([time.localtime(int(epoch)).tm_hour for epoch in epochs], dtype=np.int64)
 
 
 class AchievementSystem:
@@ -100,6 +113,8 @@ class AchievementSystem:
 
     def load_achievements(self):
         """加载成就数据"""
+        # 先等排队中的写入完成，避免读到旧文件
+        persistence.flush()
         if os.path.exists(self.achievements_file):
             try:
                 with open(self.achievements_file, 'r', encoding='utf-8') as f:
@@ -110,96 +125,55 @@ class AchievementSystem:
         return {"unlocked": {}, "stats": {}}
 
     def save_achievements(self):
-        """保存成就数据"""
+        """保存成就数据（在当前线程序列化，后台线程写盘）"""
         try:
-            with open(self.achievements_file, 'w', encoding='utf-8') as f:
-                json.dump(self.achievements, f, ensure_ascii=False, indent=2)
+            data = json.dumps(self.achievements, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存成就数据失败: {e}")
+            return
+        persistence.write_text(self.achievements_file, data)
 
     def load_game_data_from_scores(self):
         """从 scores.txt 加载游戏数据并更新统计"""
-        rankings = get_rankings()
-        if not rankings:
+        # 分数库的mmap列视图，整列计算，不为每条记录创建Python对象
+        columns = get_score_columns()
+        games = len(columns.score)
+        if not games:
             print("无游戏记录数据")
             return
 
         stats = self.achievements.setdefault("stats", {})
+        scores = columns.score.astype(np.int64)
+        times = columns.seconds.astype(np.int64)
 
         # 重置基础统计（从文件重新计算）
-        stats["games_played"] = len(rankings)
-        stats["total_score"] = 0
-        stats["total_time"] = 0
-        stats["best_score"] = 0
-        stats["best_survival_time"] = 0
-        stats["max_food_in_game"] = 0
-        stats["best_food_efficiency"] = 0
-        stats["longest_session"] = 0
-        stats["played_morning"] = False
-        stats["played_night"] = False
-
-        scores_list = []
-        times_list = []
-
-        for score_data in rankings:
-            try:
-                score = int(score_data[0])
-                time_seconds = int(score_data[1])
-                date_str = score_data[2]
-
-                # 累计统计
-                stats["total_score"] += score
-                stats["total_time"] += time_seconds
-
-                # 最佳分数
-                if score > stats["best_score"]:
-                    stats["best_score"] = score
-
-                # 最佳生存时间
-                if time_seconds > stats["best_survival_time"]:
-                    stats["best_survival_time"] = time_seconds
-
-                # 食物数量计算
-                food_count = max(0, (score - time_seconds) // 50)
-                if food_count > stats["max_food_in_game"]:
-                    stats["max_food_in_game"] = food_count
-
-                # 食物效率
-                if time_seconds > 0:
-                    efficiency = food_count / time_seconds
-                    if efficiency > stats["best_food_efficiency"]:
-                        stats["best_food_efficiency"] = efficiency
-
-                # 时间相关成就
-                try:
-                    # 解析日期时间
-                    if " " in date_str:  # 确保是完整的时间格式
-                        date_obj = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                        hour = date_obj.hour
-
-                        if 6 <= hour < 9:
-                            stats["played_morning"] = True
-                        if hour >= 22 or hour < 4:
-                            stats["played_night"] = True
-                except Exception as e:
-                    print(f"解析日期失败: {e}, 日期: {date_str}")
+        stats["games_played"] = games
+        stats["total_score"] = int(scores.sum())
+        stats["total_time"] = int(times.sum())
+        # 最佳分数、最佳生存时间
+        stats["best_score"] = max(0, int(scores.max()))
+        stats["best_survival_time"] = max(0, int(times.max()))
+
+        # 食物数量计算
+        food_counts = np.maximum(0, (scores - times) // 50)
+        stats["max_food_in_game"] = int(food_counts.max())
 
-                # 记录分数和时间用于连续增长计算
-                scores_list.append(score)
-                times_list.append(time_seconds)
+        # 食物效率
+        played = times > 0
+        stats["best_food_efficiency"] = float((food_counts[played] / times[played]).max()) if played.any() else 0
 
-            except (ValueError, IndexError) as e:
-                print(f"解析游戏数据失败: {e}, 数据: {score_data}")
-                continue
+        # 时间相关成就（按结束时间的本地小时判断）
+        hours = local_hours(columns.epoch)
+        stats["played_morning"] = bool(((hours >= 6) & (hours < 9)).any())
+        stats["played_night"] = bool(((hours >= 22) | (hours < 4)).any())
 
-        # 计算连续增长
-        stats["consecutive_growth"] = self.calculate_consecutive_growth(scores_list)
+        # 计算连续增长（按对局先后顺序）
+        stats["consecutive_growth"] = self.calculate_consecutive_growth(scores)
 
         # 最长会话时间（使用最长游戏时间作为代理）
-        if times_list:
-            stats["longest_session"] = max(times_list)
+        stats["longest_session"] = stats["best_survival_time"]
 
-        print(f"从 scores.txt 加载了 {len(rankings)} 条游戏记录")
+        print(f"从 scores.txt 加载了 {games} 条游戏记录")
         print(f"最佳分数: {stats['best_score']}")
         print(f"最佳生存时间: {stats['best_survival_time']}秒")
         print(f"最大食物数量: {stats['max_food_in_game']}")
@@ -212,18 +186,8 @@ class AchievementSystem:
         """计算连续分数增长次数"""
         if len(scores) < 2:
             return 0
-
-        max_streak = 0
-        current_streak = 0
-
-        for i in range(1, len(scores)):
-            if scores[i] > scores[i - 1]:
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 0
-
-        return max_streak
+        scores = np.asarray(scores)
+        return longest_run(scores[1:] > scores[:-1])
 
     def update_stats(self, game_data):
         """更新游戏统计信息（实时游戏时调用）"""
@@ -1,93 +1,83 @@
+import time
 from typing import Dict, Optional, Tuple
+import numpy as np
 import pygame
-from ui import show_text, draw_button
-from score_manage import get_rankings
+from ui import show_text, draw_button, draw_panel, get_font
+from score_manage import get_score_columns, longest_run
+
+class RoundLabels:
+    """局次日期标签（如"12.2025-09-29"），按下标或切片取用时才格式化"""
+
+    def __init__(self, epochs: np.ndarray):
+        self.epochs = epochs
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def _label(self, index: int) -> str:
+        return f"{index + 1}.{time.strftime('%Y-%m-%d', time.localtime(int(self.epochs[index])))}"
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._label(i) for i in range(*key.indices(len(self)))]
+        return self._label(key if key >= 0 else key + len(self))
+
 
 #游戏分析器
 class GameAnalyzer:
 
     def analyze_data(self) -> Optional[Dict[str, any]]:
         try:
-            rankings = get_rankings()
-            if not rankings:
+            # 分数库的mmap列视图，不为每条记录创建Python对象
+            columns = get_score_columns()
+            total_games = len(columns.score)
+            if not total_games:
                 print("无有效游戏数据")
                 return None
-            if len(rankings) < 2:
+            if total_games < 2:
                 print("有效数据不足2条，无法计算增长率")
                 return None
-            try:
-                # 提取基础数据（分数、时间、日期）
-                scores = [rank[0] for rank in rankings]
-                times = []
-                for rank in rankings:
-                    try:
-                        times.append(int(rank[1]))  # 时间转换为整数（秒）
-                    except ValueError:
-                        print(f"时间转换失败，跳过数据：{rank}")
-                        return None
-                dates = [rank[2] for rank in rankings]
-            except Exception as e:
-                print(f"数据提取失败: {e}")
-                return None
 
-            # 按日期排序（确保时间顺序，避免数据混乱）
-            combined = list(zip(scores, times, dates))
-            combined.sort(key=lambda x: x[2])  # 按日期升序排列
-            scores = [item[0] for item in combined]
-            times = [item[1] for item in combined]
-            dates = [item[2] for item in combined]
+            # 按日期排序（确保时间顺序，避免数据混乱）；记录通常本来就按时间写入，已有序时不复制
+            epochs = columns.epoch
+            if np.any(epochs[1:] < epochs[:-1]):
+                order = np.argsort(epochs, kind="stable")
+                epochs = epochs[order]
+                scores = columns.score[order].astype(np.int64)
+                times = columns.seconds[order].astype(np.int64)
+            else:
+                scores = columns.score.astype(np.int64)
+                times = columns.seconds.astype(np.int64)
 
             # 1. 计算每局吃到食物（所得分数减去每存活一秒自动得一分再除五十取整）
-            food_counts = []
-            for score in scores:
-                food_count = max(0, (score-int(rank[1])) // 50)
-                food_counts.append(food_count)
+            food_counts = np.maximum(0, (scores - times) // 50)
 
             # 2. 计算每秒食物效率（食物数/游戏时间）
-            food_efficiency = []
-            for f, t in zip(food_counts, times):
-                if t > 0:
-                    food_efficiency.append(round(f / t, 2))
-                else:
-                    food_efficiency.append(0)
+            food_efficiency = np.round(np.divide(food_counts, times, out=np.zeros(total_games), where=times > 0), 2)
 
             # 3. 计算分数增长率（相邻局次对比，默认第一局为0）
-            score_pairs = zip(scores[:-1], scores[1:])
-            growth_rates = list(map(
-                lambda x: round((x[1] - x[0]) / x[0] * 100, 1) if x[0] != 0 else 0,
-                score_pairs
-            ))
-            growth_rates = [0.0] + growth_rates  # 第一局无前置数据，设为0
+            previous = scores[:-1]
+            growth_rates = np.zeros(total_games)
+            growth_rates[1:] = np.round(np.divide((scores[1:] - previous) * 100, previous,
+                                                  out=np.zeros(total_games - 1), where=previous != 0), 1)
 
             # 4. 计算效率（每分耗时：游戏时间/分数）
-            efficiency = list(map(
-                lambda s, t: round(t / s, 2) if s != 0 else 0,
-                scores,
-                times
-            ))
+            efficiency = np.round(np.divide(times, scores, out=np.zeros(total_games), where=scores != 0), 2)
 
-            # 5. 格式化日期标签
-            indexed_dates = list(enumerate(dates))
-            date_labels = [f"{idx + 1}.{date[:10]}" for idx, date in indexed_dates]
+            # 5. 格式化日期标签（按需生成，只格式化图表中可见的几项）
+            date_labels = RoundLabels(epochs)
 
             # 6. 计算汇总指标（移除日期范围相关计算）
-            avg_score = sum(scores) // len(scores)  # 平均分数（整数）
-            best_efficiency = min(efficiency) if efficiency else 0  # 最佳效率（最小每分耗时）
-            total_time = sum(times)  # 总游戏时间（秒）
-            total_food = sum(food_counts)  # 总食物数量
+            avg_score = int(scores.sum() // total_games)  # 平均分数（整数）
+            best_efficiency = float(efficiency.min())  # 最佳效率（最小每分耗时）
+            total_time = int(times.sum())  # 总游戏时间（秒）
+            total_food = int(food_counts.sum())  # 总食物数量
             overall_food_rate = round(total_food / total_time, 2) if total_time > 0 else 0  # 整体食物效率
 
             # 7. 计算最长连续增长次数
-            streak = 0
-            max_streak = 0
-            for rate in growth_rates[1:]:  # 跳过第一局的0值
-                if rate > 0:
-                    streak += 1
-                    max_streak = max(max_streak, streak)
-                else:
-                    streak = 0
-
-            # 返回完整分析结果（无日期范围字段）
+            max_streak = longest_run(growth_rates[1:] > 0)  # 跳过第一局的0值
+
+            # 返回完整分析结果（无日期范围字段），逐局数据为NumPy数组
             return {
                 "scores": scores,
                 "times": times,
@@ -96,7 +86,7 @@ class GameAnalyzer:
                 "dates": date_labels,
                 "avg_score": avg_score,
                 "best_efficiency": best_efficiency,
-                "total_games": len(rankings),
+                "total_games": total_games,
                 "total_time": total_time,
                 "total_food": total_food,
                 "food_efficiency": food_efficiency,
@@ -144,7 +134,7 @@ class GameAnalysis:
 
     def draw_tooltip(self, position: Tuple[int, int], tooltip_data: Dict):
         """绘制鼠标悬停提示框，显示当前局次的完整原始数据（优化排版）"""
-        font = pygame.font.SysFont(["SimHei", "WenQuanYi Micro Hei", "Heiti TC"], 16)
+        font = get_font(16, ["SimHei", "WenQuanYi Micro Hei", "Heiti TC"])
         # 构建提示文本（局次、分数、效率、增长率）
         text_lines = [
             f"局次：{tooltip_data['round']}",
@@ -172,9 +162,7 @@ class GameAnalysis:
             rect.y = position[1] + 12
 
         # 绘制提示框背景和边框（圆角视觉优化）
-        s = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-        s.fill(self.colors["tooltip_bg"])
-        self.screen.blit(s, (rect.x, rect.y))
+        draw_panel(self.screen, rect, self.colors["tooltip_bg"])
         pygame.draw.rect(self.screen, self.colors["tooltip_border"], rect, 1, 4)  # 圆角半径4
 
         # 绘制提示文本（增加行间距，提升可读性）
@@ -196,9 +184,7 @@ class GameAnalysis:
         )
 
         # 2. 绘制图表背景和边框（优化边框视觉）
-        bg_surface = pygame.Surface((chart_rect.width, chart_rect.height), pygame.SRCALPHA)
-        bg_surface.fill(self.colors["card_bg"])
-        self.screen.blit(bg_surface, (chart_rect.left, chart_rect.top))
+        draw_panel(self.screen, chart_rect, self.colors["card_bg"])
         pygame.draw.rect(self.screen, self.colors["chart_grid"], chart_rect, 2, 2)  # 轻微圆角
 
         # 3. 绘制网格线（优化密度，提升可读性）
@@ -232,28 +218,7 @@ class GameAnalysis:
         growth_rates = analysis_data["growth_rates"]
         total_items = len(dates)  # 总局次
 
-        # 5. 数据归一化（保持原逻辑，确保同图显示）
-        # 分数归一化（0→最低分，1→最高分）
-        max_score = max(scores) if scores else 1
-        min_score = min(scores) if scores else 0
-        normalized_scores = [(s - min_score) / (max_score - min_score) for s in scores]
-
-        # 效率归一化（0→最低效率，1→最高效率）
-        max_eff = max(efficiency) if efficiency else 1
-        min_eff = min(efficiency) if efficiency else 0
-        normalized_eff = [(e - min_eff) / (max_eff - min_eff) for e in efficiency]
-
-        # 增长率归一化（覆盖-100%~500%常见范围）
-        normalized_growth = []
-        for g in growth_rates:
-            if g < -100:
-                normalized_growth.append(0)
-            elif g > 500:
-                normalized_growth.append(1)
-            else:
-                normalized_growth.append((g + 100) / 600)
-
-        # 6. 处理可见数据范围（保持原逻辑，一屏显示8个局次）
+        # 5. 处理可见数据范围（保持原逻辑，一屏显示8个局次）
         items_per_view = 8
         start_idx = max(0, self.chart_offset)
         end_idx = min(total_items, start_idx + items_per_view)
@@ -263,13 +228,24 @@ class GameAnalysis:
 
         # 截取可见数据
         visible_dates = dates[start_idx:end_idx]
-        visible_scores = normalized_scores[start_idx:end_idx]
-        visible_eff = normalized_eff[start_idx:end_idx]
-        visible_growth = normalized_growth[start_idx:end_idx]
         raw_scores = scores[start_idx:end_idx]
         raw_eff = efficiency[start_idx:end_idx]
         raw_growth = growth_rates[start_idx:end_idx]
 
+        # 6. 数据归一化（按全部数据的最大/最小值，只换算可见的几项，确保同图显示）
+        # 分数归一化（0→最低分，1→最高分）
+        max_score = scores.max() if total_items else 1
+        min_score = scores.min() if total_items else 0
+        visible_scores = (raw_scores - min_score) / ((max_score - min_score) or 1)
+
+        # 效率归一化（0→最低效率，1→最高效率）
+        max_eff = efficiency.max() if total_items else 1
+        min_eff = efficiency.min() if total_items else 0
+        visible_eff = (raw_eff - min_eff) / ((max_eff - min_eff) or 1)
+
+        # 增长率归一化（覆盖-100%~500%常见范围）
+        visible_growth = (np.clip(raw_growth, -100, 500) + 100) / 600
+
         # 7. 绘制滚动指示器（优化位置和样式）
         if total_items > items_per_view:
             scroll_indicator_width = chart_rect.width * (items_per_view / total_items)
@@ -423,9 +399,7 @@ class GameAnalysis:
                 card_height
             )
             # 卡片背景与边框（优化圆角和透明度）
-            card_surface = pygame.Surface((card_width, card_height), pygame.SRCALPHA)
-            card_surface.fill(self.colors["card_bg"])
-            self.screen.blit(card_surface, (card_rect.left, card_rect.top))
+            draw_panel(self.screen, card_rect, self.colors["card_bg"])
             pygame.draw.rect(self.screen, self.colors["chart_grid"], card_rect, 2, 3)  # 圆角半径3
 
             # 汇总卡片标题（优化位置，增加底部间距）
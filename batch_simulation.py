@@ -0,0 +1,161 @@
+# batch_simulation.py - NumPy批量模拟器（一次调用同时推进N局游戏）
+from typing import Optional
+
+import numpy as np
+
+import simulation
+from simulation import CELL_SIZE, TICK_SCORE, FOOD_SCORE, MODE_CLASSIC, MODE_LEVEL
+
+# 方向向量查表（下标为方向）
+_DX = np.array([dx for dx, _ in simulation.DIRECTION_VECTORS], dtype=np.int32)
+_DY = np.array([dy for _, dy in simulation.DIRECTION_VECTORS], dtype=np.int32)
+_OPPOSITE = np.array(simulation.OPPOSITE, dtype=np.int8)
+
+# 随机放置食物的最大重试轮数，超过后对剩余的局逐个扫描空位
+_FOOD_RETRIES = 8
+
+
+class BatchSimulator:
+    """用NumPy数组保存N局相互独立的游戏，step一次推进全部未结束的局
+
+    支持经典模式和闯关模式（障碍物+目标分数）的规则；进化模式的能力效果
+    只在simulation中实现。蛇身为环形缓冲区，body[i, head_pos[i]]为第i局的蛇头格子。
+    """
+
+    def __init__(self, n: int, width: int = 1000, height: int = 750, mode: str = MODE_CLASSIC,
+                 obstacles=None, score_target: int = 0, seed: Optional[int] = None,
+                 blocked: Optional[bytes] = None):
+        self.n = n
+        self.cols = width // CELL_SIZE
+        self.rows = height // CELL_SIZE
+        self.cells = self.cols * self.rows
+        self.capacity = self.cells + 1
+        self.mode = mode
+        self.score_target = score_target
+        self.rng = np.random.default_rng(seed)
+        mask = blocked if blocked is not None else simulation.obstacle_mask(obstacles or [], self.cols, self.rows)
+        self.blocked = np.frombuffer(bytes(mask), dtype=np.uint8).astype(bool)
+
+        self.head_x = np.zeros(n, dtype=np.int32)
+        self.head_y = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.head_pos = np.zeros(n, dtype=np.int32)
+        self.body = np.zeros((n, self.capacity), dtype=np.int32)
+        self.occupancy = np.zeros((n, self.cells), dtype=np.uint8)
+        self.food = np.full(n, -1, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.dead = np.zeros(n, dtype=bool)
+        self.cleared = np.zeros(n, dtype=bool)
+        self.ate = np.zeros(n, dtype=bool)
+
+        self.reset()
+
+    @property
+    def over(self) -> np.ndarray:
+        return self.dead | self.cleared
+
+    def reset(self, mask: Optional[np.ndarray] = None):
+        """重置指定的局（默认全部），初始状态与simulation.SimState一致"""
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        if idx.size == 0:
+            return
+        start = [x for x in range(5, 0, -1)]  # 蛇头在前
+        self.occupancy[idx] = 0
+        self.body[idx] = 0
+        # 环形缓冲区从尾到头依次写入，蛇头位于下标len-1
+        self.body[idx, :len(start)] = np.array(start[::-1], dtype=np.int32)
+        self.occupancy[idx[:, None], np.array(start)[None, :]] = 1
+        self.head_pos[idx] = len(start) - 1
+        self.head_x[idx] = start[0]
+        self.head_y[idx] = 0
+        self.length[idx] = len(start)
+        self.direction[idx] = simulation.RIGHT
+        self.score[idx] = 0
+        self.tick[idx] = 0
+        self.dead[idx] = False
+        self.cleared[idx] = False
+        self.ate[idx] = False
+        self.food[idx] = -1
+        self._place_food(idx)
+
+    def _place_food(self, idx: np.ndarray):
+        """为指定的局在空闲格子放置食物（先批量随机抽样，失败的再逐个扫描）"""
+        pending = idx
+        for _ in range(_FOOD_RETRIES):
+            if pending.size == 0:
+                return
+            picks = self.rng.integers(0, self.cells, size=pending.size, dtype=np.int32)
+            free = (self.occupancy[pending, picks] == 0) & ~self.blocked[picks]
+            self.food[pending[free]] = picks[free]
+            pending = pending[~free]
+        for i in pending:
+            candidates = np.flatnonzero((self.occupancy[i] == 0) & ~self.blocked)
+            self.food[i] = self.rng.choice(candidates) if candidates.size else -1
+
+    def step(self, actions: Optional[np.ndarray] = None) -> np.ndarray:
+        """推进所有未结束的局一帧，actions为每局的新方向（-1表示保持），返回本帧死亡的掩码"""
+        alive = ~self.over
+        idx = np.flatnonzero(alive)
+        self.ate[:] = False
+        if idx.size == 0:
+            return np.zeros(self.n, dtype=bool)
+
+        # 改变方向（不能直接掉头）
+        if actions is not None:
+            act = np.asarray(actions, dtype=np.int8)[idx]
+            cur = self.direction[idx]
+            turn = (act >= 0) & (act != _OPPOSITE[cur])
+            self.direction[idx[turn]] = act[turn]
+
+        d = self.direction[idx]
+        nx = self.head_x[idx] + _DX[d]
+        ny = self.head_y[idx] + _DY[d]
+        self.head_x[idx] = nx
+        self.head_y[idx] = ny
+        self.tick[idx] += 1
+        self.score[idx] += TICK_SCORE
+
+        inside = (nx >= 0) & (nx < self.cols) & (ny >= 0) & (ny < self.rows)
+        died = ~inside
+        moving = idx[inside]
+        cell = (ny * self.cols + nx)[inside]
+
+        # 新蛇头写入环形缓冲区
+        head_pos = (self.head_pos[moving] + 1) % self.capacity
+        self.head_pos[moving] = head_pos
+        self.body[moving, head_pos] = cell
+        self.occupancy[moving, cell] += 1
+
+        # 吃到食物则增长，否则移除尾部
+        ate = cell == self.food[moving]
+        eaters = moving[ate]
+        self.ate[eaters] = True
+        self.score[eaters] += FOOD_SCORE
+        self.length[eaters] += 1
+        shrink = moving[~ate]
+        tail_pos = (self.head_pos[shrink] - self.length[shrink]) % self.capacity
+        tail_cell = self.body[shrink, tail_pos]
+        self.occupancy[shrink, tail_cell] -= 1
+        if eaters.size:
+            self._place_food(eaters)
+
+        # 死亡判定：闯关模式撞墙/撞障碍物，经典模式撞墙/撞到自己
+        if self.mode == MODE_LEVEL:
+            died[inside] = self.blocked[cell]
+        else:
+            died[inside] = self.occupancy[moving, cell] > 1
+        self.dead[idx[died]] = True
+
+        if self.mode == MODE_LEVEL:
+            self.cleared[idx] = ~self.dead[idx] & (self.score[idx] >= self.score_target)
+
+        result = np.zeros(self.n, dtype=bool)
+        result[idx[died]] = True
+        return result
+
+    def body_cells(self, i: int) -> np.ndarray:
+        """第i局的蛇身格子下标（蛇头在前）"""
+        positions = (self.head_pos[i] - np.arange(self.length[i])) % self.capacity
+        return self.body[i, positions]
@@ -2,3 +2,7 @@
 SCREEN_X = 1000
 SCREEN_Y = 750
 SCORE_FILE = 'scores.txt'
+# 后台写盘队列的长度（排满时提交方等待）
+PERSIST_QUEUE_SIZE = 256
+# 后台写盘的fsync策略："never" / "file" / "full"（见persistence.py）
+PERSIST_FSYNC = 'file'
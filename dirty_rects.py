@@ -0,0 +1,78 @@
+# dirty_rects.py - 脏矩形刷新：只把本帧和上一帧画过的区域提交到屏幕
+import pygame
+
+# 脏矩形超过这个数量，或总面积超过屏幕的这个比例时，直接整屏刷新
+MAX_DIRTY_RECTS = 400
+MAX_DIRTY_AREA_RATIO = 0.5
+
+
+def merge_runs(rects):
+    """把首尾相接的矩形（如蛇身格子）合并成横向或纵向的直线段，每段一个矩形"""
+    runs = []
+    current = None
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        if current is not None:
+            same_row = rect.y == current.y and rect.height == current.height
+            same_col = rect.x == current.x and rect.width == current.width
+            # 同一行/列且相接或重叠（穿墙后不相接，另起一段）
+            if (same_row and rect.left <= current.right and rect.right >= current.left) or \
+                    (same_col and rect.top <= current.bottom and rect.bottom >= current.top):
+                current.union_ip(rect)
+                continue
+            runs.append(current)
+        current = rect
+    if current is not None:
+        runs.append(current)
+    return runs
+
+
+class DirtyRectTracker:
+    """收集每帧变化的区域，用pygame.display.update(rects)代替整屏刷新
+
+    每帧都把会变化的元素（蛇、食物、HUD、弹出面板等）标记出来；提交时连同上一帧
+    标记的区域一起刷新，这样移走或消失的元素所在位置也会被背景覆盖。
+    切换界面、窗口被遮挡后等无法确定变化范围的情况调用invalidate()整屏刷新一次。
+    """
+
+    def __init__(self, screen_size):
+        self.screen_rect = pygame.Rect((0, 0), screen_size)
+        self.max_area = self.screen_rect.width * self.screen_rect.height * MAX_DIRTY_AREA_RATIO
+        self.rects = []
+        self.prev_rects = []
+        self.full_redraw = True
+        self.full_updates = 0
+        self.partial_updates = 0
+
+    def mark(self, rect):
+        """标记本帧变化的一个区域"""
+        self.rects.append(pygame.Rect(rect))
+
+    def mark_many(self, rects):
+        """标记本帧变化的多个区域"""
+        self.rects.extend(pygame.Rect(rect) for rect in rects)
+
+    def mark_runs(self, rects):
+        """标记一串首尾相接的区域（先合并成直线段，长蛇不会因矩形数量过多退回整屏刷新）"""
+        self.rects.extend(merge_runs(rects))
+
+    def invalidate(self):
+        """下一次提交时整屏刷新"""
+        self.full_redraw = True
+
+    def update(self):
+        """把本帧的变化提交到屏幕"""
+        rects = [rect.clip(self.screen_rect) for rect in self.rects + self.prev_rects]
+        area = sum(rect.width * rect.height for rect in rects)
+        if self.full_redraw or len(rects) > MAX_DIRTY_RECTS or area > self.max_area:
+            pygame.display.update()
+            self.full_updates += 1
+        else:
+            pygame.display.update(rects)
+            self.partial_updates += 1
+        self.prev_rects = self.rects
+        self.rects = []
+        self.full_redraw = False
+
+    def get_stats(self):
+        return {"full_updates": self.full_updates, "partial_updates": self.partial_updates}
@@ -1,16 +1,39 @@
 import pygame
 import sys
-from score_manage import save_score, get_rankings
-from moudle.snake import Snake
-from moudle.food import Food
-from ui import show_text, draw_button
+import random
+from score_manage import save_score, get_leaderboard
+import simulation
+from simulation import new_game, step, cell_rect, evolution_speed, interpolated_cells, EVOLUTION_STAGES, CELL_SIZE
+from ui import show_text, draw_button, draw_panel
+from glyph_atlas import draw_hud_text
+from dirty_rects import DirtyRectTracker
+from snake_sprites import NOISE_VARIANTS, draw_segments, evolved_head_sprite, segment_sprite
 from sound import SoundManager
-from time_manager import TimeManager
+from time_manager import TimeManager, FixedTimestep
+from replay import ReplayRecorder, replay_id, replay_path
 from analysis import GameAnalysis
+import themes
 from level_manage import LevelManager
 from level_select import LevelSelect
 from achievement_ui import AchievementUI
 
+# 最多缓存的关卡背景层数量（每层是一张整屏图）
+LEVEL_BACKGROUND_CACHE_SIZE = 8
+
+# 方向键到规则引擎方向的映射
+KEY_DIRECTIONS = {
+    pygame.K_UP: simulation.UP,
+    pygame.K_DOWN: simulation.DOWN,
+    pygame.K_LEFT: simulation.LEFT,
+    pygame.K_RIGHT: simulation.RIGHT,
+}
+
+
+# 经典模式每秒模拟帧数
+CLASSIC_TICK_RATE = 10
+# 最多排队的方向输入（快速连按两个方向时依次在后续模拟帧生效）
+MAX_QUEUED_INPUTS = 3
+
 
 class GameState:
     # 游戏状态定义
@@ -28,27 +51,28 @@ class GameState:
         self.screen = screen
         self.state = self.MAIN_MENU
         self.prev_state = self.MAIN_MENU
-        self.snake = Snake()
-        self.food = Food()
-        self.scores = 0
-        self.isdead = False
+        self.screen_width, self.screen_height = screen.get_size()
+        self.sim = new_game(simulation.MODE_CLASSIC, self.screen_width, self.screen_height)
         self.score_saved = False
         self.clock = pygame.time.Clock()
+        # 游戏画面只刷新变化的区域；drawn_state用于切换界面时整屏刷新一次
+        self.dirty = DirtyRectTracker(screen.get_size())
+        self.drawn_state = None
         self.sound_manager = SoundManager()
         self.level_manager = LevelManager()
         self.level_select = LevelSelect(screen)
         self.current_level = None
+        self.compiled_level = None
+        self.level_backgrounds = {}  # (关卡ID, 主题, 宽, 高) -> (编译后的关卡, 背景层)
         self.level_time_used = 0
         self.evolution_level = 0
         self.special_abilities = []
         self.evolution_timer = 0
 
-        self.screen_width, self.screen_height = screen.get_size()
-        self.food.set(self.screen_width, self.screen_height, self.snake.body)
-
         self.bgm_btn = pygame.Rect(self.screen_width - 90, 10, 40, 40)
         self.pause_btn = pygame.Rect(self.screen_width - 40, 10, 40, 40)
         self.back_btn = pygame.Rect(10, 10, 40, 40)
+        self.level_panel_rect = pygame.Rect(self.screen_width - 300, 10, 290, 100)  # 闯关模式关卡信息面板
 
         # 颜色配置
         self.colors = {
@@ -82,24 +106,113 @@ class GameState:
             "score_panel_bg": (180, 200, 220, 200)
         }
 
+        # 颜色只在启动和切换主题时刷新，不再每帧读取
+        self.update_theme_colors()
+        themes.subscribe(self.on_theme_changed)
+
         self.sound_manager.play_bgm()
 
         self.time_manager = TimeManager()
+        # 规则引擎按固定步长推进，与画面刷新率无关
+        self.sim_clock = FixedTimestep(CLASSIC_TICK_RATE)
+        self.input_queue = []  # 尚未被模拟帧消费的方向输入
+        self.recorder = None  # 当前对局的回放记录（只记录种子和输入）
+        self.effect_rng = random.Random()  # 绘制特效用的随机数，不影响规则引擎
         self.analysis = GameAnalysis(screen)
         self.ranking_scroll_offset = 0
 
+    @property
+    def scores(self):
+        return self.sim.score
+
+    @property
+    def isdead(self):
+        return self.sim.dead
+
+    def advance_simulation(self, tick_rate):
+        """按固定步长推进规则引擎，返回本帧内是否吃到食物、是否进化"""
+        self.sim_clock.set_rate(tick_rate)
+        ate = evolved = False
+        for _ in range(self.sim_clock.advance()):
+            if self.sim.over:
+                break
+            action = self.input_queue.pop(0) if self.input_queue else None
+            if action is not None and self.recorder:
+                self.recorder.record(self.sim.tick + 1, action)
+            step(self.sim, action)
+            ate = ate or self.sim.ate
+            evolved = evolved or self.sim.evolved
+        return ate, evolved
+
+    def new_session(self, mode, record=True, **level_args):
+        """用新的随机种子开一局（记录回放时只需保存种子和输入）"""
+        seed = random.SystemRandom().getrandbits(63)
+        self.sim = new_game(mode, self.screen_width, self.screen_height, seed=seed, **level_args)
+        self.recorder = ReplayRecorder(self.sim, seed) if record else None
+        self.effect_rng = random.Random(seed)
+        self.sim_clock.reset()
+        self.input_queue = []
+
+    def save_game_result(self):
+        """保存分数和对应的回放文件（回放按结束时间与scores.txt中的记录对应）"""
+        game_time = self.time_manager.get_elapsed()
+        end_time = self.time_manager.get_game_end_time()
+        if self.recorder:
+            # 记录中带上回放编号，同一秒结束的两局回放不会互相覆盖
+            rid = replay_id(self.recorder.replay.seed)
+            save_score(f"{self.scores},{game_time},{end_time},{rid}", self.sim.mode)
+            self.recorder.save(replay_path(end_time, rid=rid), self.scores, self.sim.tick)
+        else:
+            save_score(f"{self.scores},{game_time},{end_time}", self.sim.mode)
+        self.score_saved = True
+
+    def queue_direction(self, key):
+        """按渲染帧采样方向键并排队，每个模拟帧消费一个（忽略重复方向和直接掉头）"""
+        direction = KEY_DIRECTIONS.get(key)
+        if direction is None or len(self.input_queue) >= MAX_QUEUED_INPUTS:
+            return
+        last = self.input_queue[-1] if self.input_queue else self.sim.direction
+        if direction != last and direction != simulation.OPPOSITE[last]:
+            self.input_queue.append(direction)
+
+    def snake_rects(self):
+        """按模拟帧之间的进度插值得到蛇身矩形（只在绘制时创建）"""
+        alpha = 1.0 if self.sim.over else self.sim_clock.alpha
+        return [pygame.Rect(round(x * CELL_SIZE), round(y * CELL_SIZE), CELL_SIZE, CELL_SIZE)
+                for x, y in interpolated_cells(self.sim, alpha)]
+
+    def report_sim_stats(self):
+        """一局结束时报告延迟/丢弃的模拟帧"""
+        stats = self.sim_clock.get_stats()
+        if stats["late_ticks"] or stats["dropped_ticks"]:
+            print(f"模拟帧统计：共{stats['ticks']}帧，延迟{stats['late_ticks']}帧，丢弃{stats['dropped_ticks']}帧")
+
+    def draw_snake(self):
+        """绘制蛇（两个模拟帧之间插值）"""
+        rects = self.snake_rects()
+        self.dirty.mark_runs(rects)
+        draw_segments(self.screen, rects, segment_sprite(self.colors["snake_head"], 2),
+                      segment_sprite(self.colors["snake_body"], 2))
+
+    def draw_food(self):
+        if self.sim.food is not None:
+            rect = cell_rect(self.sim.food)
+            pygame.draw.rect(self.screen, self.colors["food_color"], rect, 0, 3)
+            self.dirty.mark(rect)
+
     def handle_playing(self):
         screen = self.screen
-        self.update_theme_colors()
         mx, my = pygame.mouse.get_pos()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.VIDEOEXPOSE:
+                self.dirty.invalidate()
             if event.type == pygame.KEYDOWN:
-                # 正常方向控制
-                self.snake.changedirection(event.key)
+                # 正常方向控制（在下一个模拟帧生效）
+                self.queue_direction(event.key)
                 # 空格键重新开始（游戏结束时）
                 if event.key == pygame.K_SPACE and self.isdead:
                     self.reset_game()
@@ -137,47 +250,32 @@ class GameState:
 
         # 左下角分数与时间面板
         info_bg_rect = pygame.Rect(10, self.screen_height - 80, 300, 70)
-        info_surface = pygame.Surface((info_bg_rect.width, info_bg_rect.height), pygame.SRCALPHA)
-        info_surface.fill(self.colors["score_panel_bg"])
-        screen.blit(info_surface, (info_bg_rect.x, info_bg_rect.y))
+        draw_panel(screen, info_bg_rect, self.colors["score_panel_bg"])
         pygame.draw.rect(screen, (180, 200, 220), info_bg_rect, 1)
+        self.dirty.mark_many((self.back_btn, self.bgm_btn, self.pause_btn, info_bg_rect))
         # 显示分数
-        show_text(screen, (20, self.screen_height - 70), f'分数: {self.scores}',
-                  self.colors["text_normal"], is_center=False, font_size=24)
+        draw_hud_text(screen, (20, self.screen_height - 70), f'分数: {self.scores}',
+                      self.colors["text_normal"], font_size=24)
         # 显示时间
-        show_text(screen, (20, self.screen_height - 40), f'时间: {self.time_manager.get_formatted_time()}',
-                  self.colors["text_normal"], is_center=False, font_size=24)
+        draw_hud_text(screen, (20, self.screen_height - 40), f'时间: {self.time_manager.get_formatted_time()}',
+                      self.colors["text_normal"], font_size=24)
 
-        # 游戏逻辑（未死亡时）
+        # 游戏逻辑（未死亡时，按固定步长推进）
         if not self.isdead:
-            self.scores += 1  # 每帧加1分
-            self.snake.move()  # 蛇移动
-
-            # 检测吃到普通食物
-            if self.snake.body[0].colliderect(self.food.rect):
-                self.scores += 50  # 吃到食物加50分
-                self.snake.grow()  # 蛇增长
-                self.food.set(self.screen_width, self.screen_height, self.snake.body)  # 生成新食物
+            ate, _ = self.advance_simulation(CLASSIC_TICK_RATE)
+            if ate:
                 self.sound_manager.play_eat_sound()  # 播放吃食物音效
-            else:
-                self.snake.remove_tail()  # 未吃到食物则移除尾部
 
         # 绘制蛇
-        for i, rect in enumerate(self.snake.body):
-            color = self.colors["snake_head"] if i == 0 else self.colors["snake_body"]
-            pygame.draw.rect(screen, color, rect, 0, 2)
-            pygame.draw.rect(screen, (180, 200, 220, 30), rect, 1, 2)
+        self.draw_snake()
 
-        # 死亡检测与处理
-        self.isdead = self.snake.isdead(self.screen_width, self.screen_height)
+        # 死亡处理
         if self.isdead:
             if not self.score_saved:
-                # 保存分数数据
-                game_time = self.time_manager.get_elapsed()
-                end_time = self.time_manager.get_game_end_time()
-                save_score(f"{self.scores},{game_time},{end_time}")
-                self.score_saved = True
+                # 保存分数数据和回放
+                self.save_game_result()
                 self.sound_manager.play_death_sound()  # 播放死亡音效
+                self.report_sim_stats()
 
             # 游戏结束面板
             death_bg_rect = pygame.Rect(
@@ -185,10 +283,9 @@ class GameState:
                 (self.screen_height - 180) // 2,
                 400, 180
             )
-            death_surface = pygame.Surface((death_bg_rect.width, death_bg_rect.height), pygame.SRCALPHA)
-            death_surface.fill(self.colors["panel_bg"])
-            screen.blit(death_surface, (death_bg_rect.x, death_bg_rect.y))
+            draw_panel(screen, death_bg_rect, self.colors["panel_bg"])
             pygame.draw.rect(screen, (180, 200, 220), death_bg_rect, 2)
+            self.dirty.mark(death_bg_rect)
 
             # 显示游戏结束文字
             show_text(screen, (self.screen_width // 2, death_bg_rect.y + 50),
@@ -199,11 +296,10 @@ class GameState:
                       '按空格键重新开始', self.colors["text_normal"], is_center=True, font_size=24)
 
         # 绘制普通食物
-        pygame.draw.rect(screen, self.colors["food_color"], self.food.rect, 0, 3)
+        self.draw_food()
 
-        # 更新屏幕显示
-        pygame.display.update()
-        self.clock.tick(10)  # 控制游戏速度
+        # 只刷新变化的区域（帧率由run统一控制）
+        self.dirty.update()
         if self.isdead and not self.score_saved:
             # 保存分数数据
             game_time = self.time_manager.get_elapsed()
@@ -226,9 +322,8 @@ class GameState:
 
     def handle_ranking(self):
         """处理排行榜界面逻辑"""
-        self.update_theme_colors()
         screen = self.screen
-        rankings = get_rankings()
+        rankings = get_leaderboard().entries  # 内存中的排行榜，只在有新记录时增量更新
         # 填充排行榜背景
         screen.fill(self.colors["ranking_bg"])
 
@@ -238,9 +333,7 @@ class GameState:
             self.screen_width - 40,
             self.screen_height - 100
         )
-        content_surface = pygame.Surface((content_rect.width, content_rect.height), pygame.SRCALPHA)
-        content_surface.fill(self.colors["game_bg"])
-        screen.blit(content_surface, (content_rect.x, content_rect.y))
+        draw_panel(screen, content_rect, self.colors["game_bg"])
         pygame.draw.rect(screen, (180, 200, 220), content_rect, 1)
 
         # 鼠标位置获取
@@ -365,8 +458,7 @@ class GameState:
         """处理主菜单界面逻辑（优化排版和主题同步）"""
         screen = self.screen
 
-        # 每次进入主菜单时更新主题颜色
-        self.update_theme_colors()
+        # 主题颜色在切换主题时已通过on_theme_changed更新
         screen.fill(self.colors["main_menu_bg"])
 
         # 主菜单标题（上移）
@@ -452,10 +544,7 @@ class GameState:
                 if theme_btn.collidepoint(mx, my):
                     from theme_select import ThemeSelect
                     theme_select = ThemeSelect(self.screen)
-                    result = theme_select.run()
-                    if result == "APPLIED":
-                        # 主题已更改，强制刷新颜色
-                        self.update_theme_colors()
+                    theme_select.run()  # 应用主题后颜色由on_theme_changed统一刷新
                 # 本地排行
                 if rank_btn.collidepoint(mx, my):
                     self.prev_state = self.MAIN_MENU
@@ -489,9 +578,7 @@ class GameState:
             (self.screen_height - 200) // 2,
             300, 200
         )
-        panel_surface = pygame.Surface((panel_rect.width, panel_rect.height), pygame.SRCALPHA)
-        panel_surface.fill(self.colors["panel_bg"])
-        screen.blit(panel_surface, (panel_rect.x, panel_rect.y))
+        draw_panel(screen, panel_rect, self.colors["panel_bg"])
         pygame.draw.rect(screen, (180, 200, 220), panel_rect, 2)
 
         # 暂停标题
@@ -558,11 +645,7 @@ class GameState:
 
     def reset_game(self):
         """重置游戏状态"""
-        self.snake = Snake()
-        self.food = Food()
-        self.food.set(self.screen_width, self.screen_height, self.snake.body)
-        self.scores = 0
-        self.isdead = False
+        self.new_session(simulation.MODE_CLASSIC)
         self.score_saved = False
         self.time_manager.start()
 
@@ -576,6 +659,7 @@ class GameState:
         """退出暂停状态"""
         self.state = self.prev_state
         self.time_manager.resume()
+        self.sim_clock.resume()
 
     def handle_level_select(self):
         next_state, level_id = self.level_select.run()
@@ -592,12 +676,14 @@ class GameState:
             self.state = self.LEVEL_SELECT
             return
 
-        # 重置游戏状态
-        self.snake = Snake()
-        self.food = Food()
-        self.food.set(self.screen_width, self.screen_height, self.snake.body, self.current_level["obstacles"])  # 传入障碍物
-        self.scores = 0
-        self.isdead = False
+        # 编译关卡（障碍物掩码和绘制用矩形只生成一次）
+        self.compiled_level = self.level_manager.compile_level(self.current_level, self.screen_width,
+                                                               self.screen_height)
+
+        # 重置游戏状态（传入障碍物掩码和目标分数，闯关成绩不进排行榜，不记录回放）
+        self.new_session(simulation.MODE_LEVEL, record=False,
+                         score_target=self.compiled_level.score_target,
+                         blocked=self.compiled_level.blocked)
         self.score_saved = False
         self.time_manager.start()
         self.level_time_used = 0
@@ -605,6 +691,33 @@ class GameState:
         # 设置关卡速度（覆盖默认10FPS）
         self.game_speed = self.current_level["speed"]
 
+    def level_background(self):
+        """获取当前关卡的静态背景层（按关卡、主题和屏幕尺寸缓存）"""
+        key = (self.compiled_level.level_id, themes.CURRENT_THEME, self.screen_width, self.screen_height)
+        cached = self.level_backgrounds.get(key)
+        # 关卡被编辑保存后会重新编译，旧的背景层随之失效
+        if cached is not None and cached[0] is self.compiled_level:
+            return cached[1]
+
+        layer = pygame.Surface((self.screen_width, self.screen_height)).convert()
+        layer.fill(self.colors["game_bg"])
+        # 关卡信息面板和左下角分数面板的底色
+        for panel_rect in (self.level_panel_rect, pygame.Rect(10, self.screen_height - 80, 300, 70)):
+            draw_panel(layer, panel_rect, self.colors["score_panel_bg"])
+            pygame.draw.rect(layer, (180, 200, 220), panel_rect, 1)
+        # 按钮的普通状态（悬停时在上面重画），画在面板之上，与悬停时的层次一致
+        draw_button(layer, self.back_btn, '←', self.colors["btn_normal"])
+        draw_button(layer, self.pause_btn, '||', self.colors["btn_normal"])
+        # 障碍物（使用编译好的矩形）
+        for obstacle_rect in self.compiled_level.rects:
+            pygame.draw.rect(layer, self.colors["text_warning"], obstacle_rect, 0, 3)
+            pygame.draw.rect(layer, (0, 0, 0), obstacle_rect, 1, 3)
+
+        if len(self.level_backgrounds) >= LEVEL_BACKGROUND_CACHE_SIZE:
+            self.level_backgrounds.pop(next(iter(self.level_backgrounds)))
+        self.level_backgrounds[key] = (self.compiled_level, layer)
+        return layer
+
     def handle_play_level(self):
         """处理闯关模式游戏进行中的逻辑"""
         if not self.current_level:
@@ -620,10 +733,12 @@ class GameState:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.VIDEOEXPOSE:
+                self.dirty.invalidate()
             if event.type == pygame.KEYDOWN:
-                self.snake.changedirection(event.key)
-                # 空格键重新开始（关卡失败/通关后）
-                if event.key == pygame.K_SPACE and (self.isdead or self.scores >= level["score_target"]):
+                self.queue_direction(event.key)
+                # 空格键重新开始（关卡失败/通关/超时后）
+                if event.key == pygame.K_SPACE and self.sim.over:
                     self.load_level(level["level_id"])
                 # P键暂停/继续
                 if event.key == pygame.K_p:
@@ -642,115 +757,82 @@ class GameState:
                     self.state = self.LEVEL_SELECT
                     self.time_manager.pause()
 
-        # 填充背景
-        screen.fill(self.colors["game_bg"])
+        # 静态背景层（背景色、障碍物、按钮和面板底色），只在关卡或主题变化时重新生成
+        screen.blit(self.level_background(), (0, 0))
 
-        # 绘制UI元素
-        # 返回按钮
-        back_btn_color = self.colors["btn_hover"] if self.back_btn.collidepoint(mx, my) else self.colors["btn_normal"]
-        draw_button(screen, self.back_btn, '←', back_btn_color)
-        # BGM按钮
+        # 悬停的按钮和BGM按钮（图标随播放状态变化）画在背景层之上
+        if self.back_btn.collidepoint(mx, my):
+            draw_button(screen, self.back_btn, '←', self.colors["btn_hover"])
         bgm_btn_color = self.colors["btn_hover"] if self.bgm_btn.collidepoint(mx, my) else self.colors["btn_normal"]
         bgm_icon = "▶" if not self.sound_manager.is_bgm_playing() and self.sound_manager.is_bgm_loaded() else "■" if self.sound_manager.is_bgm_loaded() else "?"
         draw_button(screen, self.bgm_btn, bgm_icon, bgm_btn_color)
-        # 暂停按钮
-        pause_btn_color = self.colors["btn_hover"] if self.pause_btn.collidepoint(mx, my) else self.colors["btn_normal"]
-        draw_button(screen, self.pause_btn, '||', pause_btn_color)
+        if self.pause_btn.collidepoint(mx, my):
+            draw_button(screen, self.pause_btn, '||', self.colors["btn_hover"])
 
-        # 关卡信息面板（新增）
-        level_panel_rect = pygame.Rect(self.screen_width - 300, 10, 290, 100)
-        panel_surface = pygame.Surface((level_panel_rect.width, level_panel_rect.height), pygame.SRCALPHA)
-        panel_surface.fill(self.colors["score_panel_bg"])
-        screen.blit(panel_surface, (level_panel_rect.x, level_panel_rect.y))
-        pygame.draw.rect(screen, (180, 200, 220), level_panel_rect, 1)
+        # 关卡信息面板
+        level_panel_rect = self.level_panel_rect
+        self.dirty.mark(level_panel_rect)
         # 关卡名称
         show_text(screen, (level_panel_rect.x + 10, level_panel_rect.y + 20), f'关卡：{level["name"]}',
                   self.colors["text_normal"], is_center=False, font_size=20)
         # 剩余时间
-        self.level_time_used = self.time_manager.get_elapsed()
+        if not self.sim.over:
+            self.level_time_used = self.time_manager.get_elapsed()
         time_left = max(0, level["time_limit"] - self.level_time_used)
         time_color = self.colors["text_warning"] if time_left < 10 else self.colors["text_normal"]
-        show_text(screen, (level_panel_rect.x + 10, level_panel_rect.y + 50),
-                  f'剩余时间：{time_left // 60:02d}:{time_left % 60:02d}',
-                  time_color, is_center=False, font_size=20)
+        draw_hud_text(screen, (level_panel_rect.x + 10, level_panel_rect.y + 50),
+                      f'剩余时间：{time_left // 60:02d}:{time_left % 60:02d}',
+                      time_color, font_size=20)
         # 分数进度
         progress = min(100, (self.scores / level["score_target"]) * 100)
-        show_text(screen, (level_panel_rect.x + 10, level_panel_rect.y + 80), f'分数进度：{progress:.0f}%',
-                  self.colors["text_normal"], is_center=False, font_size=20)
+        draw_hud_text(screen, (level_panel_rect.x + 10, level_panel_rect.y + 80), f'分数进度：{progress:.0f}%',
+                      self.colors["text_normal"], font_size=20)
 
         # 左下角分数面板
         info_bg_rect = pygame.Rect(10, self.screen_height - 80, 300, 70)
-        info_surface = pygame.Surface((info_bg_rect.width, info_bg_rect.height), pygame.SRCALPHA)
-        info_surface.fill(self.colors["score_panel_bg"])
-        screen.blit(info_surface, (info_bg_rect.x, info_bg_rect.y))
-        pygame.draw.rect(screen, (180, 200, 220), info_bg_rect, 1)
-        show_text(screen, (20, self.screen_height - 70), f'当前分数: {self.scores}',
-                  self.colors["text_normal"], is_center=False, font_size=24)
-        show_text(screen, (20, self.screen_height - 40), f'目标分数: {level["score_target"]}',
-                  self.colors["text_normal"], is_center=False, font_size=24)
-
-        # 游戏逻辑（未死亡、未通关时）
-        # 在 handle_play_level 方法的游戏逻辑部分修改
-        if not self.isdead and self.scores < level["score_target"] and self.level_time_used < level["time_limit"]:
-            self.snake.move()  # 先移动再检测碰撞（关键修改）
-            self.scores += 1  # 每帧加1分
-
-            # 检测撞墙（加强判定）
-            head = self.snake.body[0]
-            if (head.x < 0 or head.x >= self.screen_width or
-                    head.y < 0 or head.y >= self.screen_height):
-                self.isdead = True
-                self.sound_manager.play_death_sound()  # 立即播放死亡音效
-                return  # 一旦撞墙直接结束本轮逻辑
-
-            # 检测吃到食物
-            if head.colliderect(self.food.rect):
-                self.scores += 50
-                self.snake.grow()
-                self.food.set(self.screen_width, self.screen_height, self.snake.body, level["obstacles"])
+        self.dirty.mark_many((self.back_btn, self.bgm_btn, self.pause_btn, info_bg_rect))
+        draw_hud_text(screen, (20, self.screen_height - 70), f'当前分数: {self.scores}',
+                      self.colors["text_normal"], font_size=24)
+        draw_hud_text(screen, (20, self.screen_height - 40), f'目标分数: {level["score_target"]}',
+                      self.colors["text_normal"], font_size=24)
+
+        # 超时由实际计时判定（暂停期间不计时）
+        if not self.sim.over and self.level_time_used >= level["time_limit"]:
+            self.sim.timed_out = True
+
+        # 游戏逻辑（未死亡、未通关、未超时时，按关卡速度固定步长推进）
+        if not self.sim.over:
+            ate, _ = self.advance_simulation(self.game_speed)
+            if ate:
                 self.sound_manager.play_eat_sound()
-            else:
-                self.snake.remove_tail()
-
-            # 检测碰撞障碍物
-            for obstacle in level["obstacles"]:
-                obs_rect = pygame.Rect(*obstacle)
-                if head.colliderect(obs_rect):
-                    self.isdead = True
-                    self.sound_manager.play_death_sound()
-                    break
-
-        # 绘制障碍物
-        for obstacle in level["obstacles"]:
-            pygame.draw.rect(screen, self.colors["text_warning"], obstacle, 0, 3)
-            pygame.draw.rect(screen, (0, 0, 0), obstacle, 1, 3)
 
         # 绘制蛇
-        for i, rect in enumerate(self.snake.body):
-            color = self.colors["snake_head"] if i == 0 else self.colors["snake_body"]
-            pygame.draw.rect(screen, color, rect, 0, 2)
-            pygame.draw.rect(screen, (180, 200, 220, 30), rect, 1, 2)
+        self.draw_snake()
 
         # 绘制食物
-        pygame.draw.rect(screen, self.colors["food_color"], self.food.rect, 0, 3)
+        self.draw_food()
 
-        # 通关检测
-        if self.scores >= level["score_target"] and not self.score_saved:
-            # 保存关卡分数
-            self.level_manager.save_level_score(level["level_id"], self.scores, self.level_time_used)
+        # 通关/失败结算（只执行一次）
+        if self.sim.over and not self.score_saved:
             self.score_saved = True
-            self.sound_manager.play_eat_sound()  # 播放通关音效
+            if self.sim.cleared:
+                # 保存关卡分数
+                self.level_manager.save_level_score(level["level_id"], self.scores, self.level_time_used)
+                self.sound_manager.play_eat_sound()  # 播放通关音效
+            elif self.isdead:
+                self.sound_manager.play_death_sound()
+            self.report_sim_stats()
 
-            # 通关面板
+        # 通关面板
+        if self.sim.cleared:
             pass_panel_rect = pygame.Rect(
                 (self.screen_width - 400) // 2,
                 (self.screen_height - 180) // 2,
                 400, 180
             )
-            pass_surface = pygame.Surface((pass_panel_rect.width, pass_panel_rect.height), pygame.SRCALPHA)
-            pass_surface.fill(self.colors["panel_bg"])
-            screen.blit(pass_surface, (pass_panel_rect.x, pass_panel_rect.y))
+            draw_panel(screen, pass_panel_rect, self.colors["panel_bg"])
             pygame.draw.rect(screen, (0, 120, 0), pass_panel_rect, 2)
+            self.dirty.mark(pass_panel_rect)
             show_text(screen, (self.screen_width // 2, pass_panel_rect.y + 50),
                       '关卡通关!', (0, 120, 0), is_center=True, font_size=60)
             show_text(screen, (self.screen_width // 2, pass_panel_rect.y + 100),
@@ -759,22 +841,16 @@ class GameState:
             show_text(screen, (self.screen_width // 2, pass_panel_rect.y + 140),
                       '按空格键重新挑战', self.colors["text_normal"], is_center=True, font_size=24)
 
-        # 失败检测（死亡或超时）
-        if (self.isdead or self.level_time_used >= level["time_limit"]) and not self.score_saved:
-            self.score_saved = True
-            if self.isdead:
-                self.sound_manager.play_death_sound()
-
-            # 失败面板
+        # 失败面板（死亡或超时）
+        elif self.sim.over:
             fail_panel_rect = pygame.Rect(
                 (self.screen_width - 400) // 2,
                 (self.screen_height - 180) // 2,
                 400, 180
             )
-            fail_surface = pygame.Surface((fail_panel_rect.width, fail_panel_rect.height), pygame.SRCALPHA)
-            fail_surface.fill(self.colors["panel_bg"])
-            screen.blit(fail_surface, (fail_panel_rect.x, fail_panel_rect.y))
+            draw_panel(screen, fail_panel_rect, self.colors["panel_bg"])
             pygame.draw.rect(screen, self.colors["text_warning"], fail_panel_rect, 2)
+            self.dirty.mark(fail_panel_rect)
 
             fail_text = '碰撞障碍物!' if self.isdead else '时间耗尽!'
             show_text(screen, (self.screen_width // 2, fail_panel_rect.y + 50),
@@ -784,27 +860,22 @@ class GameState:
             show_text(screen, (self.screen_width // 2, fail_panel_rect.y + 140),
                       '按空格键重新挑战', self.colors["text_normal"], is_center=True, font_size=24)
 
-        # 更新屏幕
-        pygame.display.update()
-        self.clock.tick(self.game_speed)  # 使用关卡自定义速度
+        # 只刷新变化的区域（关卡速度只影响模拟步长）
+        self.dirty.update()
 
     def handle_evolution_mode(self):
-        """处理进化模式游戏逻辑"""
-        if not hasattr(self, 'evolution_mode'):
-            from evolution_mode import EvolutionMode
-            self.evolution_mode = EvolutionMode(self.screen)
-
-        # 使用进化模式的特殊逻辑
+        """处理进化模式游戏逻辑（规则由simulation的进化模式处理）"""
         screen = self.screen
-        self.update_theme_colors()
         mx, my = pygame.mouse.get_pos()
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.VIDEOEXPOSE:
+                self.dirty.invalidate()
             if event.type == pygame.KEYDOWN:
-                self.snake.changedirection(event.key)
+                self.queue_direction(event.key)
                 # 空格键重新开始（游戏结束时）
                 if event.key == pygame.K_SPACE and self.isdead:
                     self.reset_evolution_game()
@@ -842,55 +913,34 @@ class GameState:
 
         # 左下角分数与时间面板
         info_bg_rect = pygame.Rect(10, self.screen_height - 80, 300, 70)
-        info_surface = pygame.Surface((info_bg_rect.width, info_bg_rect.height), pygame.SRCALPHA)
-        info_surface.fill(self.colors["score_panel_bg"])
-        screen.blit(info_surface, (info_bg_rect.x, info_bg_rect.y))
+        draw_panel(screen, info_bg_rect, self.colors["score_panel_bg"])
         pygame.draw.rect(screen, (180, 200, 220), info_bg_rect, 1)
+        self.dirty.mark_many((self.back_btn, self.bgm_btn, self.pause_btn, info_bg_rect))
         # 显示分数
-        show_text(screen, (20, self.screen_height - 70), f'分数: {self.scores}',
-                  self.colors["text_normal"], is_center=False, font_size=24)
+        draw_hud_text(screen, (20, self.screen_height - 70), f'分数: {self.scores}',
+                      self.colors["text_normal"], font_size=24)
         # 显示时间
-        show_text(screen, (20, self.screen_height - 40), f'时间: {self.time_manager.get_formatted_time()}',
-                  self.colors["text_normal"], is_center=False, font_size=24)
+        draw_hud_text(screen, (20, self.screen_height - 40), f'时间: {self.time_manager.get_formatted_time()}',
+                      self.colors["text_normal"], font_size=24)
 
-        # 游戏逻辑（未死亡时）
+        # 游戏逻辑（未死亡时，无敌状态的死亡豁免在规则引擎中处理）
         if not self.isdead:
-            self.scores += 1  # 每帧加1分
-            self.snake.move()  # 蛇移动
-
-            # 检测吃到普通食物
-            if self.snake.body[0].colliderect(self.food.rect):
-                self.scores += 50  # 吃到食物加50分
-                self.snake.grow()  # 蛇增长
-                self.food.set(self.screen_width, self.screen_height, self.snake.body)  # 生成新食物
+            ate, evolved = self.advance_simulation(evolution_speed(self.sim))
+            if ate:
                 self.sound_manager.play_eat_sound()  # 播放吃食物音效
-
-                # 进化模式特殊逻辑 - 修复进化检测
-                self.evolution_mode.food_eaten += 1
-                # 立即检查并应用进化
-                if self.evolution_mode.check_evolution():
-                    self.evolution_mode.apply_special_ability()
-                    print(f"进化到: {self.evolution_mode.evolution_stages[self.evolution_mode.current_stage]['name']}")
-            else:
-                self.snake.remove_tail()  # 未吃到食物则移除尾部
+            if evolved:
+                print(f"进化到: {EVOLUTION_STAGES[self.sim.stage]['name']}")
 
         # 绘制蛇 - 根据进化阶段使用不同颜色
         self.draw_evolved_snake()
 
-        # 死亡检测（考虑无敌效果）
-        is_invincible = any(effect['type'] == 'invincible' for effect in self.evolution_mode.active_effects)
-        if not is_invincible:
-            self.isdead = self.snake.isdead(self.screen_width, self.screen_height)
-
         # 死亡处理
         if self.isdead:
             if not self.score_saved:
-                # 保存分数数据
-                game_time = self.time_manager.get_elapsed()
-                end_time = self.time_manager.get_game_end_time()
-                save_score(f"{self.scores},{game_time},{end_time}")
-                self.score_saved = True
+                # 保存分数数据和回放
+                self.save_game_result()
                 self.sound_manager.play_death_sound()  # 播放死亡音效
+                self.report_sim_stats()
 
             # 游戏结束面板（像正常模式那样显示）
             death_bg_rect = pygame.Rect(
@@ -898,10 +948,9 @@ class GameState:
                 (self.screen_height - 180) // 2,
                 400, 180
             )
-            death_surface = pygame.Surface((death_bg_rect.width, death_bg_rect.height), pygame.SRCALPHA)
-            death_surface.fill(self.colors["panel_bg"])
-            screen.blit(death_surface, (death_bg_rect.x, death_bg_rect.y))
+            draw_panel(screen, death_bg_rect, self.colors["panel_bg"])
             pygame.draw.rect(screen, (180, 200, 220), death_bg_rect, 2)
+            self.dirty.mark(death_bg_rect)
 
             # 显示游戏结束文字
             show_text(screen, (self.screen_width // 2, death_bg_rect.y + 50),
@@ -914,47 +963,24 @@ class GameState:
         # 绘制进化模式UI - 优化排版，移到右上角
         self.draw_evolution_ui_optimized()
 
-        # 更新特殊效果
-        self.evolution_mode.update_effects()
-
         # 绘制普通食物
-        pygame.draw.rect(screen, self.colors["food_color"], self.food.rect, 0, 3)
+        self.draw_food()
 
-        # 更新屏幕显示
-        pygame.display.update()
-        self.clock.tick(self.evolution_mode.get_current_speed())
+        # 只刷新变化的区域（进化速度只影响模拟步长）
+        self.dirty.update()
 
     def draw_evolved_snake(self):
         """根据进化阶段绘制不同外观的蛇"""
         screen = self.screen
-        current_stage = self.evolution_mode.evolution_stages[self.evolution_mode.current_stage]
-
-        for i, rect in enumerate(self.snake.body):
-            # 根据进化阶段设置颜色
-            if i == 0:  # 蛇头
-                color = current_stage["color"]
-                # 绘制蛇头
-                pygame.draw.rect(screen, color, rect, 0, 5)
-
-                # 根据能力添加特殊效果
-                if current_stage["ability"] == "火焰蛇":
-                    # 火焰效果
-                    flame_rect = pygame.Rect(rect.x - 2, rect.y - 2, rect.width + 4, rect.height + 4)
-                    pygame.draw.rect(screen, (255, 150, 0), flame_rect, 2, 5)
-                elif current_stage["ability"] == "雷霆蛇":
-                    # 闪电效果
-                    import random
-                    for j in range(3):
-                        spark_x = rect.x + random.randint(0, rect.width)
-                        spark_y = rect.y + random.randint(0, rect.height)
-                        pygame.draw.circle(screen, (255, 255, 0), (spark_x, spark_y), 2)
-            else:  # 蛇身
-                # 蛇身颜色稍微变暗
-                body_color = tuple(max(0, c - 30) for c in current_stage["color"])
-                pygame.draw.rect(screen, body_color, rect, 0, 3)
-
-            # 绘制边框
-            pygame.draw.rect(screen, (180, 200, 220, 30), rect, 1, 2)
+        current_stage = EVOLUTION_STAGES[self.sim.stage]
+
+        rects = self.snake_rects()
+        # 火焰和闪电效果会超出格子2像素
+        self.dirty.mark_runs(rect.inflate(4, 4) for rect in rects)
+        # 蛇头按进化阶段带特效（闪电火花每帧随机取一个预先生成的图块），蛇身颜色稍微变暗
+        head = evolved_head_sprite(current_stage, self.effect_rng.randrange(NOISE_VARIANTS))
+        body = segment_sprite(tuple(max(0, c - 30) for c in current_stage["color"]), 3)
+        draw_segments(screen, rects, head, body)
 
     def draw_evolution_ui_optimized(self):
         """绘制优化排版的进化模式UI"""
@@ -967,17 +993,16 @@ class GameState:
         panel_y = 80  # 下移避免与BGM/暂停按钮重叠
 
         # 创建半透明背景面板
-        panel_surface = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
-        panel_surface.fill((180, 200, 220, 180))  # 半透明背景
-        screen.blit(panel_surface, (panel_x, panel_y))
+        draw_panel(screen, (panel_x, panel_y, panel_width, panel_height), (180, 200, 220, 180))  # 半透明背景
         pygame.draw.rect(screen, (150, 180, 210), (panel_x, panel_y, panel_width, panel_height), 2)
+        self.dirty.mark((panel_x, panel_y, panel_width, panel_height))
 
         # 当前阶段信息
-        current_stage = self.evolution_mode.evolution_stages[self.evolution_mode.current_stage]
+        current_stage = EVOLUTION_STAGES[self.sim.stage]
 
         # 计算下一阶段信息（如果有）
-        if self.evolution_mode.current_stage < len(self.evolution_mode.evolution_stages) - 1:
-            next_stage = self.evolution_mode.evolution_stages[self.evolution_mode.current_stage + 1]
+        if self.sim.stage < len(EVOLUTION_STAGES) - 1:
+            next_stage = EVOLUTION_STAGES[self.sim.stage + 1]
             food_required = next_stage["food_required"]
             next_stage_name = next_stage["name"]
         else:
@@ -995,19 +1020,19 @@ class GameState:
                   self.colors["text_normal"], is_center=False, font_size=20)
 
         # 进度条背景（只在有下一阶段时显示）
-        if self.evolution_mode.current_stage < len(self.evolution_mode.evolution_stages) - 1:
+        if self.sim.stage < len(EVOLUTION_STAGES) - 1:
             progress_bg_rect = pygame.Rect(panel_x + 10, text_y + line_height, panel_width - 20, 12)
             pygame.draw.rect(screen, (200, 200, 200), progress_bg_rect, 0, 6)
 
             # 进度条前景
-            progress = min(1.0, self.evolution_mode.food_eaten / food_required)
+            progress = min(1.0, self.sim.food_eaten / food_required)
             progress_fg_rect = pygame.Rect(panel_x + 10, text_y + line_height,
                                            int((panel_width - 20) * progress), 12)
             progress_color = (100, 200, 100) if progress < 1.0 else (100, 150, 255)
             pygame.draw.rect(screen, progress_color, progress_fg_rect, 0, 6)
 
             # 进度文字
-            progress_text = f'{self.evolution_mode.food_eaten}/{food_required}'
+            progress_text = f'{self.sim.food_eaten}/{food_required}'
             show_text(screen, (panel_x + panel_width // 2, text_y + line_height + 6),
                       progress_text, self.colors["text_normal"], is_center=True, font_size=14)
 
@@ -1022,9 +1047,9 @@ class GameState:
                       (255, 200, 0), is_center=False, font_size=18)
 
         # 特殊能力显示（如果有）
-        if self.evolution_mode.active_effects:
+        if self.sim.effects:
             effect_text = "特殊能力："
-            for effect in self.evolution_mode.active_effects:
+            for effect in self.sim.effects:
                 if effect['type'] == 'speed_boost':
                     effect_text += "加速 "
                 elif effect['type'] == 'invincible':
@@ -1036,31 +1061,21 @@ class GameState:
                       effect_text, self.colors["text_warning"], is_center=False, font_size=16)
 
     def reset_evolution_game(self):
-        """重置进化模式游戏"""
-        self.snake = Snake()
-        self.food = Food()
-        self.food.set(self.screen_width, self.screen_height, self.snake.body)
-        self.scores = 0
-        self.isdead = False
+        """重置进化模式游戏（进化阶段、食物计数和效果随新一局一起重置）"""
+        self.new_session(simulation.MODE_EVOLUTION)
         self.score_saved = False
         self.time_manager.start()
 
-        # 重置进化模式状态
-        if hasattr(self, 'evolution_mode'):
-            self.evolution_mode.current_stage = 0
-            self.evolution_mode.food_eaten = 0
-            self.evolution_mode.active_effects = []
-
-    def update_theme_colors(self):
-        """更新主题颜色"""
-        from themes import get_current_theme
-        self.colors = get_current_theme()
+    def on_theme_changed(self, theme_name):
+        """主题切换回调：刷新颜色，丢弃按旧主题生成的背景层并整屏重绘"""
+        self.update_theme_colors()
+        self.level_backgrounds.clear()
+        self.dirty.invalidate()
 
     def update_theme_colors(self):
-        """更新主题颜色 - 只更新游戏运行相关颜色"""
+        """更新主题颜色 - 只更新游戏运行相关颜色（只在初始化和主题切换时调用）"""
         try:
-            from themes import get_current_theme
-            theme_colors = get_current_theme()
+            theme_colors = themes.get_current_theme()
 
             # 只更新游戏运行相关的颜色
             self.colors.update({
@@ -1071,8 +1086,6 @@ class GameState:
                 "obstacle": theme_colors.get("obstacle", (180, 60, 60))
             })
 
-            print(f"游戏主题已更新")
-
         except Exception as e:
             print(f"加载游戏主题失败: {e}")
             # 回退到默认游戏颜色
@@ -1087,6 +1100,10 @@ class GameState:
     def run(self):
         """游戏主循环"""
         while True:
+            # 切换界面后第一帧整屏刷新
+            if self.state != self.drawn_state:
+                self.dirty.invalidate()
+                self.drawn_state = self.state
             if self.state == self.MAIN_MENU:
                 self.handle_main_menu()
             elif self.state == self.PLAYING:
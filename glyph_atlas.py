@@ -0,0 +1,81 @@
+# glyph_atlas.py - HUD数字图集：预先渲染数字、冒号和固定的中文标签，每帧只需拼接子区域
+from typing import Dict, Tuple
+
+import pygame
+
+from ui import get_font, render_text
+
+# 逐字拼接的字符（分数、时间、百分比中会出现的字符）
+GLYPH_CHARS = "0123456789:% "
+# HUD中固定不变的标签，整体渲染为一个图块
+HUD_LABELS = ("分数: ", "时间: ", "当前分数: ", "目标分数: ", "剩余时间：", "分数进度：")
+
+# (字号, 颜色) -> GlyphAtlas，主题颜色变化时自动生成新的图集
+_atlases: Dict[Tuple[int, tuple], "GlyphAtlas"] = {}
+
+
+class GlyphAtlas:
+    """把一组字符和标签渲染到同一张图上，draw时用一次Surface.blits拼出整串文字"""
+
+    def __init__(self, font_size: int, color, labels=HUD_LABELS, chars: str = GLYPH_CHARS):
+        self.font_size = font_size
+        self.color = tuple(color)
+        font = get_font(font_size)
+        pieces = list(labels) + list(chars)
+        surfaces = [font.render(piece, True, self.color) for piece in pieces]
+        height = max(surface.get_height() for surface in surfaces)
+        self.surface = pygame.Surface((sum(surface.get_width() for surface in surfaces), height), pygame.SRCALPHA)
+        self.rects: Dict[str, pygame.Rect] = {}
+        x = 0
+        for piece, surface in zip(pieces, surfaces):
+            # 图集是透明底，用MAX混合直接拷贝像素（普通alpha混合会让字的边缘发暗）
+            self.surface.blit(surface, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.rects[piece] = pygame.Rect(x, 0, surface.get_width(), surface.get_height())
+            x += surface.get_width()
+        # 标签按长度从长到短匹配（"当前分数: "优先于"分数: "）
+        self.labels = sorted(labels, key=len, reverse=True)
+
+    def layout(self, text: str):
+        """把文字拆成图集中的子区域，遇到图集中没有的字符返回None"""
+        rects = []
+        i = 0
+        while i < len(text):
+            for label in self.labels:
+                if text.startswith(label, i):
+                    rects.append(self.rects[label])
+                    i += len(label)
+                    break
+            else:
+                rect = self.rects.get(text[i])
+                if rect is None:
+                    return None
+                rects.append(rect)
+                i += 1
+        return rects
+
+    def draw(self, screen: pygame.Surface, pos: Tuple[int, int], text: str):
+        """以pos为左上角绘制文字；包含图集外的字符时退回普通的文字渲染"""
+        rects = self.layout(text)
+        if rects is None:
+            screen.blit(render_text(text, self.font_size, self.color), pos)
+            return
+        x, y = pos
+        blits = []
+        for rect in rects:
+            blits.append((self.surface, (x, y), rect))
+            x += rect.width
+        screen.blits(blits, doreturn=False)
+
+
+def get_atlas(font_size: int, color) -> GlyphAtlas:
+    """按字号和颜色获取（必要时创建）HUD图集"""
+    key = (font_size, tuple(color))
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = _atlases[key] = GlyphAtlas(font_size, color)
+    return atlas
+
+
+def draw_hud_text(screen: pygame.Surface, pos: Tuple[int, int], text: str, color, font_size: int = 24):
+    """用图集绘制HUD文字（左上角对齐），参数顺序与ui.show_text一致"""
+    get_atlas(font_size, color).draw(screen, pos, text)
@@ -0,0 +1,264 @@
+# level_catalog.py - 关卡目录：只保存关卡的摘要信息（不含障碍物坐标），按页从磁盘读取，支持按名称搜索和按难度筛选
+#
+# levels.json.headers   第一行为元数据{"version", "source", "count"}，之后每行一条关卡摘要（JSON数组，含障碍物哈希），
+#                       顺序与LevelManager.get_all_levels相同
+# levels.json.offsets   每条摘要所在行的起始字节位置uint64，最后多一个文件结尾位置，按页读取时直接定位
+# levels.json.obstacles / levels.json.obstacles.offsets
+#                       每行一个关卡的障碍物列表及其偏移表（生成缩略图时按下标只读一行）
+#
+# 打开目录只读元数据行并比较levels.json的(修改时间, 大小)，与关卡数量无关；
+# levels.json变化后（保存关卡或手工修改）才完整解析一次并重建摘要文件。
+# 名称索引和难度列表在第一次搜索/筛选时才建立。
+import hashlib
+import json
+import os
+import struct
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+HEADERS_SUFFIX = ".headers"
+OFFSETS_SUFFIX = ".offsets"
+OBSTACLES_SUFFIX = ".obstacles"
+_VERSION = 2
+_OFFSET = struct.Struct("<Q")
+
+# 难度等级（从低到高）
+DIFFICULTIES = ("简单", "普通", "困难", "极限")
+# 缓存的页数（翻页后返回时不必再读盘）
+PAGE_CACHE_SIZE = 8
+
+
+class LevelHeader(NamedTuple):
+    """关卡摘要（关卡选择界面需要的字段）"""
+    level_id: str
+    name: str
+    score_target: int
+    time_limit: int
+    speed: int
+    obstacle_count: int
+    is_custom: bool
+    difficulty: int  # DIFFICULTIES中的下标
+    obstacle_hash: str  # 障碍物内容的哈希（缩略图缓存的键）
+    index: int  # 在目录中的下标（按下标读取障碍物）
+
+
+def obstacle_hash(obstacles) -> str:
+    """障碍物列表的内容哈希（与坐标写成元组还是列表无关）"""
+    data = json.dumps([list(obstacle) for obstacle in obstacles], separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+def level_difficulty(speed: int, obstacle_count: int, score_target: int, time_limit: int) -> int:
+    """按速度、障碍物数量和目标分数/时间估计难度（内置关卡1~5依次为简单、普通、普通、困难、极限）"""
+    points = max(0, speed - 8) + obstacle_count // 3
+    if time_limit > 0 and score_target / time_limit >= 8:
+        points += 1
+    return min(len(DIFFICULTIES) - 1, points // 2)
+
+
+def make_header(level: Dict, index: int) -> LevelHeader:
+    obstacles = level.get("obstacles", ())
+    return LevelHeader(level["level_id"], level["name"], level["score_target"], level["time_limit"],
+                       level["speed"], len(obstacles), bool(level.get("is_custom")),
+                       level_difficulty(level["speed"], len(obstacles), level["score_target"], level["time_limit"]),
+                       obstacle_hash(obstacles), index)
+
+
+def _line_offsets(lines: List[bytes], start: int) -> bytearray:
+    """每行的起始位置，最后加上结尾位置"""
+    offsets = bytearray()
+    position = start
+    for line in lines:
+        offsets += _OFFSET.pack(position)
+        position += len(line)
+    offsets += _OFFSET.pack(position)
+    return offsets
+
+
+def _read_lines(data_path: str, offsets_path: str, start: int, stop: int) -> bytes:
+    """读取第[start, stop)行（读两个偏移量，再顺序读一段）"""
+    with open(offsets_path, "rb") as f:
+        f.seek(start * _OFFSET.size)
+        begin = _OFFSET.unpack(f.read(_OFFSET.size))[0]
+        f.seek(stop * _OFFSET.size)
+        end = _OFFSET.unpack(f.read(_OFFSET.size))[0]
+    with open(data_path, "rb") as f:
+        f.seek(begin)
+        return f.read(end - begin)
+
+
+def _file_stamp(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class LevelCatalog:
+    """按页读取关卡摘要；search/filter返回符合条件的摘要下标列表（创建后需调用refresh或rebuild）"""
+
+    def __init__(self, level_file: str):
+        self.level_file = level_file
+        self.headers_path = level_file + HEADERS_SUFFIX
+        self.offsets_path = level_file + OFFSETS_SUFFIX
+        self.obstacles_path = level_file + OBSTACLES_SUFFIX
+        self.obstacle_offsets_path = self.obstacles_path + OFFSETS_SUFFIX
+        self.count = 0
+        self.source: Optional[List[int]] = None  # 当前内容对应的levels.json(修改时间, 大小)
+        self._pages: "OrderedDict[Tuple[int, int], List[LevelHeader]]" = OrderedDict()
+        self._all: Optional[List[LevelHeader]] = None  # 建立索引时读入的全部摘要
+        self._prefix_index: List[Tuple[str, int]] = []  # (小写名称, 下标)，按名称排序
+        self._char_index: Dict[str, List[int]] = {}  # 字符 -> 名称中含有该字符的下标（升序）
+
+    # ---------- 摘要文件 ----------
+    def refresh(self):
+        """检查levels.json是否变化，变化时重建摘要文件（未变化时只读一行元数据）"""
+        source = _file_stamp(self.level_file)
+        meta = self._read_meta()
+        if meta is not None and meta.get("version") == _VERSION and meta.get("source") == source and \
+                _file_stamp(self.offsets_path) is not None and _file_stamp(self.obstacle_offsets_path) is not None:
+            # 摘要文件可能是其他LevelManager重建的，内容变了就丢弃内存中的页和索引
+            if meta["source"] != self.source or meta["count"] != self.count:
+                self._reset(meta["count"])
+                self.source = source
+            return
+        levels = []
+        if source is not None:
+            try:
+                with open(self.level_file, "r", encoding="utf-8") as f:
+                    levels = json.load(f)
+            except Exception as e:
+                print(f"读取关卡失败: {e}")
+        self.rebuild(levels)
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self.headers_path, "rb") as f:
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+
+    def rebuild(self, levels: List[Dict]):
+        """由完整的关卡列表重建摘要文件（保存关卡后直接调用，不必再解析一次levels.json）"""
+        levels = sorted(levels, key=lambda x: (x["is_custom"], x["level_id"]))
+        headers = [make_header(level, i) for i, level in enumerate(levels)]
+        meta = {"version": _VERSION, "source": _file_stamp(self.level_file), "count": len(headers)}
+        meta_line = json.dumps(meta).encode("utf-8") + b"\n"
+        lines = [json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n" for header in headers]
+        obstacle_lines = [json.dumps([list(obstacle) for obstacle in level.get("obstacles", ())],
+                                     separators=(",", ":")).encode("utf-8") + b"\n" for level in levels]
+        try:
+            # 最后写摘要：中途中断时元数据对不上，下次打开会重建
+            _write_atomic(self.obstacle_offsets_path, _line_offsets(obstacle_lines, 0))
+            _write_atomic(self.obstacles_path, b"".join(obstacle_lines))
+            _write_atomic(self.offsets_path, _line_offsets(lines, len(meta_line)))
+            _write_atomic(self.headers_path, meta_line + b"".join(lines))
+        except Exception as e:
+            print(f"保存关卡目录失败: {e}")
+        self._reset(len(headers))
+        self.source = meta["source"]
+        self._all = headers
+
+    def _reset(self, count: int):
+        self.count = count
+        self._pages.clear()
+        self._all = None
+        self._prefix_index = []
+        self._char_index = {}
+
+    def _read_range(self, start: int, stop: int) -> List[LevelHeader]:
+        """从磁盘读取[start, stop)之间的摘要"""
+        start, stop = max(0, start), min(stop, self.count)
+        if start >= stop:
+            return []
+        try:
+            data = _read_lines(self.headers_path, self.offsets_path, start, stop)
+            # 拼成一个JSON数组一次解析，比逐行解析快
+            rows = json.loads(b"[" + b",".join(data.splitlines()) + b"]")
+            return [LevelHeader(*row) for row in rows]
+        except Exception as e:
+            print(f"读取关卡目录失败: {e}")
+            return []
+
+    def read_obstacles(self, index: int) -> List[List[int]]:
+        """读取目录中第index个关卡的障碍物（只读一行，可以在后台线程调用）"""
+        return json.loads(_read_lines(self.obstacles_path, self.obstacle_offsets_path, index, index + 1))
+
+    # ---------- 查询 ----------
+    def __len__(self):
+        return self.count
+
+    def get_range(self, start: int, stop: int) -> List[LevelHeader]:
+        """按目录顺序取[start, stop)之间的摘要（结果按范围缓存）"""
+        if self._all is not None:
+            return self._all[start:stop]
+        key = (start, stop)
+        page = self._pages.get(key)
+        if page is None:
+            page = self._pages[key] = self._read_range(start, stop)
+            if len(self._pages) > PAGE_CACHE_SIZE:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(key)
+        return page
+
+    def get_headers(self, positions: List[int]) -> List[LevelHeader]:
+        """按下标取摘要（用于显示搜索/筛选结果的一页）"""
+        headers = self._load_all()
+        return [headers[i] for i in positions]
+
+    def _load_all(self) -> List[LevelHeader]:
+        if self._all is None:
+            self._all = self._read_range(0, self.count)
+        return self._all
+
+    def _build_name_index(self):
+        if self._prefix_index or not self.count:
+            return
+        names = [header.name.lower() for header in self._load_all()]
+        self._prefix_index = sorted((name, i) for i, name in enumerate(names))
+        char_index: Dict[str, List[int]] = {}
+        for i, name in enumerate(names):
+            for char in set(name):
+                char_index.setdefault(char, []).append(i)
+        self._char_index = char_index
+
+    def search(self, query: str) -> List[int]:
+        """名称包含query的关卡下标（不区分大小写）：名称以query开头的排在前面，其余按目录顺序"""
+        query = query.strip().lower()
+        if not query:
+            return list(range(self.count))
+        self._build_name_index()
+        # 前缀匹配：在排序后的名称中二分定位
+        prefix = []
+        i = bisect_left(self._prefix_index, (query, -1))
+        while i < len(self._prefix_index) and self._prefix_index[i][0].startswith(query):
+            prefix.append(self._prefix_index[i][1])
+            i += 1
+        # 子串匹配：只检查含有query中最少见字符的名称
+        postings = [self._char_index.get(char, []) for char in set(query)]
+        candidates = min(postings, key=len)
+        prefix_set = set(prefix)
+        names = self._all
+        rest = [i for i in candidates if i not in prefix_set and query in names[i].name.lower()]
+        return prefix + rest
+
+    def filter(self, positions: List[int], difficulty: Optional[int]) -> List[int]:
+        """只保留指定难度的关卡（difficulty为None时不筛选）"""
+        if difficulty is None:
+            return positions
+        headers = self._load_all()
+        return [i for i in positions if headers[i].difficulty == difficulty]
+
+    def query(self, text: str = "", difficulty: Optional[int] = None) -> List[int]:
+        """按名称搜索并按难度筛选，返回符合条件的关卡下标"""
+        return self.filter(self.search(text), difficulty)
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -1,6 +1,6 @@
 import pygame
 from typing import List, Tuple, Optional
-from ui import show_text, draw_button
+from ui import show_text, draw_button, draw_panel, get_font
 from level_manage import LevelManager
 
 class ParamDialog:
@@ -83,9 +83,7 @@ class ParamDialog:
             return
 
         # 绘制半透明背景遮罩
-        mask = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
-        mask.fill((0, 0, 0, 100))
-        self.screen.blit(mask, (0, 0))
+        draw_panel(self.screen, (0, 0, self.screen_width, self.screen_height), (0, 0, 0, 100))
 
         # 绘制弹窗
         pygame.draw.rect(self.screen, self.colors["bg"], self.dialog_rect, 0, 5)
@@ -122,9 +120,7 @@ class ParamDialog:
 
             # 光标
             if self.active_input == key:
-                font = pygame.font.SysFont(None, 18)
-                text_surface = font.render(text, True, self.colors["text"])
-                text_width = text_surface.get_width()
+                text_width = get_font(18).size(text)[0]
                 cursor_x = rect.x + 10 + text_width
                 pygame.draw.line(self.screen, self.colors["text"],
                                  (cursor_x, rect.y + 5),
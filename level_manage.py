@@ -1,6 +1,10 @@
 import os
 import json
-from typing import List, Dict, Optional,Tuple
+from typing import List, Dict, Optional, Tuple, NamedTuple
+import pygame
+import persistence
+from level_catalog import LevelCatalog
+from simulation import CELL_SIZE, obstacle_mask
 
 # 关卡数据结构模板
 LEVEL_TEMPLATE = {
@@ -13,10 +17,48 @@ LEVEL_TEMPLATE = {
     "is_custom": False
 }
 
+LEVEL_SCORE_FILE = "level_scores.json"
+
+# 关卡最佳成绩 {关卡ID: (分数, 时间)}，第一次访问时从文件读入，之后只在内存中更新
+# （本进程是唯一的写入方，save_level_score先改内存再排队写盘）
+_level_scores: Optional[Dict[str, Tuple[int, int]]] = None
+
+
+def _load_level_scores() -> Dict[str, Tuple[int, int]]:
+    global _level_scores
+    if _level_scores is None:
+        _level_scores = {}
+        if os.path.exists(LEVEL_SCORE_FILE):
+            try:
+                with open(LEVEL_SCORE_FILE, "r", encoding="utf-8") as f:
+                    _level_scores = {level_id: tuple(best) for level_id, best in json.load(f).items()}
+            except Exception as e:
+                print(f"读取关卡分数失败: {e}")
+                _level_scores = {}
+    return _level_scores
+
+
+class CompiledLevel(NamedTuple):
+    """编译后的关卡（只读）：障碍物掩码供碰撞/放置食物使用，矩形供绘制使用"""
+    level_id: str
+    name: str
+    score_target: int
+    time_limit: int
+    speed: int
+    obstacles: Tuple[Tuple[int, int, int, int], ...]
+    blocked: bytes  # 每个格子一个字节，与障碍物重叠为1
+    rects: Tuple[pygame.Rect, ...]
+
 
 class LevelManager:
     def __init__(self):
         self.level_file = "levels.json"  # 关卡数据存储文件
+        self.compiled_levels: Dict[Tuple[str, int, int], CompiledLevel] = {}  # 编译结果缓存
+        # 已解析、已排序的关卡列表和按ID的索引；文件的(修改时间, 大小)变化时重新读取
+        self._levels: Optional[List[Dict]] = None
+        self._levels_by_id: Dict[str, Dict] = {}
+        self._levels_stamp: Optional[Tuple[int, int]] = None
+        self._catalog: Optional[LevelCatalog] = None  # 关卡摘要目录（关卡选择界面使用）
         self.init_builtin_levels()  # 初始化内置关卡
 
     def init_builtin_levels(self):
@@ -86,33 +128,88 @@ class LevelManager:
             ]
             self.save_levels(builtin_levels)
 
-    def get_all_levels(self) -> List[Dict]:
-        """获取所有关卡（内置+自定义）"""
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
         try:
-            with open(self.level_file, "r", encoding="utf-8") as f:
-                levels = json.load(f)
-            # 按ID排序（内置关卡在前，自定义在后）
-            levels.sort(key=lambda x: (x["is_custom"], x["level_id"]))
-            return levels
-        except Exception as e:
-            print(f"读取关卡失败: {e}")
-            return []
+            stat = os.stat(self.level_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_levels(self) -> List[Dict]:
+        """返回缓存的关卡列表，文件被改动过（包括其他LevelManager保存的）时重新解析"""
+        stamp = self._file_stamp()
+        if self._levels is None or stamp != self._levels_stamp:
+            try:
+                with open(self.level_file, "r", encoding="utf-8") as f:
+                    levels = json.load(f)
+                # 按ID排序（内置关卡在前，自定义在后）
+                levels.sort(key=lambda x: (x["is_custom"], x["level_id"]))
+            except Exception as e:
+                print(f"读取关卡失败: {e}")
+                levels = []
+            if self._levels is not None:
+                # 关卡内容可能变了，之前的编译结果作废
+                self.compiled_levels.clear()
+            self._levels = levels
+            self._levels_by_id = {level["level_id"]: level for level in levels}
+            self._levels_stamp = stamp
+        return self._levels
+
+    def invalidate_levels(self):
+        """丢弃缓存的关卡列表，下次访问时重新读取文件"""
+        self._levels = None
+        self._levels_by_id = {}
+        self._levels_stamp = None
+
+    def get_all_levels(self) -> List[Dict]:
+        """获取所有关卡（内置+自定义），返回列表的副本，关卡字典与缓存共用，不要修改"""
+        return list(self._load_levels())
+
+    def get_catalog(self) -> LevelCatalog:
+        """获取关卡摘要目录（首次调用时打开，levels.json被改动过时重建）"""
+        if self._catalog is None:
+            self._catalog = LevelCatalog(self.level_file)
+            self._catalog.refresh()
+        return self._catalog
 
     def get_level_by_id(self, level_id: str) -> Optional[Dict]:
         """根据ID获取单个关卡信息"""
-        levels = self.get_all_levels()
-        for level in levels:
-            if level["level_id"] == level_id:
-                return level
-        return None
+        self._load_levels()
+        return self._levels_by_id.get(level_id)
+
+    def compile_level(self, level: Dict, width: int, height: int) -> CompiledLevel:
+        """把关卡编译为只读对象（按关卡ID和屏幕尺寸缓存，只编译一次）"""
+        key = (level["level_id"], width, height)
+        compiled = self.compiled_levels.get(key)
+        if compiled is None:
+            obstacles = tuple(tuple(obstacle) for obstacle in level["obstacles"])
+            compiled = CompiledLevel(
+                level_id=level["level_id"],
+                name=level["name"],
+                score_target=level["score_target"],
+                time_limit=level["time_limit"],
+                speed=level["speed"],
+                obstacles=obstacles,
+                blocked=bytes(obstacle_mask(obstacles, width // CELL_SIZE, height // CELL_SIZE)),
+                rects=tuple(pygame.Rect(obstacle) for obstacle in obstacles)
+            )
+            self.compiled_levels[key] = compiled
+        return compiled
 
     def save_levels(self, levels: List[Dict]):
-        """保存关卡列表到本地文件"""
+        """保存关卡列表到本地文件（关卡内容可能变化，清空编译缓存和关卡缓存）"""
+        self.compiled_levels.clear()
+        self.invalidate_levels()
         try:
             with open(self.level_file, "w", encoding="utf-8") as f:
                 json.dump(levels, f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"保存关卡失败: {e}")
+            return
+        # 关卡列表已在内存中，直接重建摘要目录
+        if self._catalog is None:
+            self._catalog = LevelCatalog(self.level_file)
+        self._catalog.rebuild(levels)
 
     def add_custom_level(self, level_data: Dict) -> bool:
         """添加自定义关卡（自动生成唯一ID）"""
@@ -139,42 +236,24 @@ class LevelManager:
         return True
 
     def save_level_score(self, level_id: str, score: int, time_used: int):
-        """保存关卡通关分数（独立文件，不与排行榜混淆）"""
-        score_file = "level_scores.json"
-        scores = {}
-
-        # 读取已有分数
-        if os.path.exists(score_file):
-            try:
-                with open(score_file, "r", encoding="utf-8") as f:
-                    scores = json.load(f)
-            except:
-                scores = {}
+        """保存关卡通关分数（独立文件，不与排行榜混淆；写盘由后台线程完成）"""
+        scores = _load_level_scores()
 
-        # 更新当前关卡分数（只保留最佳成绩：分数更高，或分数相同时间更短）
+        # 更新当前关卡分数（只保留最佳成绩：分数更高，或分数相同时间更短），没有刷新成绩就不写盘
         if level_id in scores:
             old_score, old_time = scores[level_id]
-            if score > old_score or (score == old_score and time_used < old_time):
-                scores[level_id] = (score, time_used)
-        else:
-            scores[level_id] = (score, time_used)
+            if not (score > old_score or (score == old_score and time_used < old_time)):
+                return
+        scores[level_id] = (score, time_used)
 
-        # 保存分数
-        try:
-            with open(score_file, "w", encoding="utf-8") as f:
-                json.dump(scores, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存关卡分数失败: {e}")
+        # 在当前线程序列化快照，后台线程只负责写文件
+        persistence.write_text(LEVEL_SCORE_FILE, json.dumps(scores, ensure_ascii=False, indent=2))
 
     def get_level_score(self, level_id: str) -> Optional[Tuple[int, int]]:
-        """获取关卡最佳分数（分数, 时间）"""
-        score_file = "level_scores.json"
-        if not os.path.exists(score_file):
-            return None
-        try:
-            with open(score_file, "r", encoding="utf-8") as f:
-                scores = json.load(f)
-            return scores.get(level_id)
-        except Exception as e:
-            print(f"读取关卡分数失败: {e}")
-            return None
\ No newline at end of file
+        """获取关卡最佳分数（分数, 时间），没有成绩返回None"""
+        return _load_level_scores().get(level_id)
+
+    def get_level_scores(self, level_ids) -> Dict[str, Optional[Tuple[int, int]]]:
+        """批量获取关卡最佳分数 {关卡ID: (分数, 时间)或None}"""
+        scores = _load_level_scores()
+        return {level_id: scores.get(level_id) for level_id in level_ids}
\ No newline at end of file
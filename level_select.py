@@ -1,8 +1,11 @@
 import pygame
-from typing import List, Dict, Optional, Tuple
+from typing import List, Optional, Tuple
 from ui import show_text, draw_button
 from level_manage import LevelManager
 from level_editor import LevelEditor
+from level_catalog import DIFFICULTIES, LevelHeader
+from level_thumbnails import ThumbnailCache
+import themes
 
 
 class LevelSelect:
@@ -10,8 +13,14 @@ class LevelSelect:
         self.screen = screen
         self.screen_width, self.screen_height = screen.get_size()
         self.level_manager = LevelManager()
+        self.catalog = self.level_manager.get_catalog()  # 关卡摘要目录（按页读取，不解析障碍物）
         self.level_editor = LevelEditor(screen)
         self.scroll_offset = 0  # 关卡列表滚动偏移
+        self.search_text = ""  # 名称搜索关键字
+        self.difficulty: Optional[int] = None  # 难度筛选（DIFFICULTIES中的下标，None为全部）
+        self.results: Optional[List[int]] = None  # 搜索/筛选结果的目录下标，None表示不筛选
+        self.thumbnails = ThumbnailCache(self.catalog)  # 障碍物缩略图（后台生成，磁盘缓存）
+        self.prefetched = None  # 已预取过下一页的(页码, 筛选结果)
 
         # UI配置
         self.colors = {
@@ -27,6 +36,8 @@ class LevelSelect:
         # 按钮位置
         self.back_btn = pygame.Rect(10, 10, 40, 40)
         self.edit_btn = pygame.Rect(self.screen_width - 150, 10, 140, 40)
+        self.search_rect = pygame.Rect(self.screen_width // 2 - 270, 650, 360, 32)
+        self.difficulty_btn = pygame.Rect(self.screen_width // 2 + 100, 650, 170, 32)
 
         # 关卡卡片配置
         self.card_width = 200
@@ -34,18 +45,55 @@ class LevelSelect:
         self.card_spacing = 30
         self.cards_per_row = 4
 
-    def get_visible_levels(self) -> List[Dict]:
-        """获取当前可见的关卡（支持滚动）"""
-        all_levels = self.level_manager.get_all_levels()
+    @property
+    def items_per_page(self) -> int:
+        return self.cards_per_row * 3
+
+    def update_results(self):
+        """搜索关键字或难度变化后重新筛选，并回到第一页"""
+        if self.search_text.strip() or self.difficulty is not None:
+            self.results = self.catalog.query(self.search_text, self.difficulty)
+        else:
+            self.results = None
+        self.scroll_offset = 0
+
+    def get_level_count(self) -> int:
+        """当前列表（筛选后）的关卡数"""
+        return len(self.catalog) if self.results is None else len(self.results)
+
+    def get_total_pages(self) -> int:
+        return max(1, (self.get_level_count() + self.items_per_page - 1) // self.items_per_page)
+
+    def get_visible_levels(self) -> Tuple[List[LevelHeader], bool]:
+        """获取当前页的关卡摘要（只读取这一页）"""
         # 计算可见范围
-        items_per_page = self.cards_per_row * 3
-        start_idx = self.scroll_offset * items_per_page
-        end_idx = start_idx + items_per_page
-        return all_levels[start_idx:end_idx], len(all_levels) > items_per_page
+        start_idx = self.scroll_offset * self.items_per_page
+        end_idx = start_idx + self.items_per_page
+        if self.results is None:
+            levels = self.catalog.get_range(start_idx, end_idx)
+        else:
+            levels = self.catalog.get_headers(self.results[start_idx:end_idx])
+        return levels, self.get_level_count() > self.items_per_page
+
+    def prefetch_next_page(self, colors):
+        """翻到新的一页时预取下一页的缩略图"""
+        state = (self.scroll_offset, id(self.results))
+        if state == self.prefetched:
+            return
+        self.prefetched = state
+        start_idx = (self.scroll_offset + 1) * self.items_per_page
+        end_idx = start_idx + self.items_per_page
+        if self.results is None:
+            levels = self.catalog.get_range(start_idx, end_idx)
+        else:
+            levels = self.catalog.get_headers(self.results[start_idx:end_idx])
+        self.thumbnails.prefetch(levels, colors)
 
     def draw_level_cards(self):
         """绘制关卡卡片"""
         visible_levels, has_scroll = self.get_visible_levels()
+        best_scores = self.level_manager.get_level_scores(level.level_id for level in visible_levels)
+        theme_colors = themes.get_current_theme()
         mx, my = pygame.mouse.get_pos()
 
         for idx, level in enumerate(visible_levels):
@@ -64,38 +112,54 @@ class LevelSelect:
             pygame.draw.rect(self.screen, self.colors["text_normal"], card_rect, 1, 5)
 
             # 绘制关卡信息
-            level_id = level["level_id"]
-            level_name = level["name"]
-            score_target = level["score_target"]
-            is_custom = level["is_custom"]
+            level_id = level.level_id
+            level_name = level.name
+            score_target = level.score_target
+            is_custom = level.is_custom
 
             # 关卡类型标签（内置/自定义）
             tag_text = "自定义" if is_custom else f"关卡{level_id.split('_')[1]}"
             tag_color = (255, 165, 0) if is_custom else self.colors["text_normal"]
             show_text(self.screen, (x + 10, y + 15), tag_text, tag_color, is_center=False, font_size=16)
-
-            # 关卡名称（换行处理）
-            if len(level_name) > 8:
-                level_name = level_name[:8] + "..."
-            show_text(self.screen, (x + self.card_width // 2, y + 50), level_name, self.colors["text_title"],
-                      font_size=20)
+            show_text(self.screen, (x + self.card_width - 45, y + 15), DIFFICULTIES[level.difficulty],
+                      self.colors["text_normal"], is_center=False, font_size=16)
+
+            # 障碍物缩略图（还没生成好时先画空白底）
+            thumb_rect = pygame.Rect((x + 10, y + 38), self.thumbnails.size)
+            thumbnail = self.thumbnails.get(level, theme_colors)
+            if thumbnail is not None:
+                self.screen.blit(thumbnail, thumb_rect)
+            else:
+                pygame.draw.rect(self.screen, theme_colors["game_bg"], thumb_rect)
+            pygame.draw.rect(self.screen, self.colors["text_normal"], thumb_rect, 1)
+
+            # 关卡名称和分数目标显示在缩略图右侧（换行处理）
+            info_x = (thumb_rect.right + x + self.card_width) // 2
+            if len(level_name) > 5:
+                level_name = level_name[:5] + "..."
+            show_text(self.screen, (info_x, y + 55), level_name, self.colors["text_title"], font_size=18)
 
             # 分数目标
-            show_text(self.screen, (x + self.card_width // 2, y + 85), f"目标: {score_target}分",
-                      self.colors["text_normal"], font_size=18)
+            show_text(self.screen, (info_x, y + 85), f"目标: {score_target}分", self.colors["text_normal"],
+                      font_size=16)
 
             # 最佳成绩（如果有）
-            best_score = self.level_manager.get_level_score(level_id)
+            best_score = best_scores[level_id]
             if best_score:
                 score, time_used = best_score
                 time_str = f"{time_used // 60:02d}:{time_used % 60:02d}"
-                show_text(self.screen, (x + self.card_width // 2, y + 115), f"最佳: {score}分/{time_str}", (0, 120, 0),
+                show_text(self.screen, (x + self.card_width // 2, y + 120), f"最佳: {score}分/{time_str}", (0, 120, 0),
                           font_size=16)
 
+        self.prefetch_next_page(theme_colors)
+
+        if not visible_levels and self.results is not None:
+            show_text(self.screen, (self.screen_width // 2, 300), "没有符合条件的关卡", self.colors["text_normal"],
+                      font_size=24)
+
         # 绘制滚动指示器（如果需要滚动）
         if has_scroll:
-            total_pages = (len(self.level_manager.get_all_levels()) + self.cards_per_row * 2 - 1) // (
-                        self.cards_per_row * 2)
+            total_pages = self.get_total_pages()
             indicator_width = 100
             indicator_height = 8
             indicator_x = self.screen_width // 2 - indicator_width // 2
@@ -106,8 +170,10 @@ class LevelSelect:
                              (indicator_x, indicator_y, indicator_width, indicator_height), 0, 4)
 
             # 绘制当前页指示器
-            page_indicator_width = indicator_width // total_pages
-            page_indicator_x = indicator_x + self.scroll_offset * page_indicator_width
+            # 页数很多时每页对应的宽度不足1像素，指示块至少保留4像素
+            page_indicator_width = max(4, indicator_width // total_pages)
+            page_indicator_x = indicator_x + self.scroll_offset * (indicator_width - page_indicator_width) // max(
+                1, total_pages - 1)
             pygame.draw.rect(self.screen, self.colors["btn_hover"],
                              (page_indicator_x, indicator_y, page_indicator_width, indicator_height), 0, 4)
 
@@ -120,6 +186,7 @@ class LevelSelect:
 
         # 绘制关卡卡片
         self.draw_level_cards()
+        self.draw_search_bar()
 
         # 绘制按钮
         mx, my = pygame.mouse.get_pos()
@@ -133,6 +200,38 @@ class LevelSelect:
 
         pygame.display.update()
 
+    def draw_search_bar(self):
+        """绘制名称搜索框和难度筛选按钮"""
+        pygame.draw.rect(self.screen, (240, 245, 250), self.search_rect, 0, 5)
+        pygame.draw.rect(self.screen, self.colors["text_normal"], self.search_rect, 1, 5)
+        if self.search_text:
+            show_text(self.screen, (self.search_rect.x + 10, self.search_rect.y + 7), self.search_text + "|",
+                      self.colors["text_normal"], is_center=False, font_size=18)
+        else:
+            show_text(self.screen, (self.search_rect.x + 10, self.search_rect.y + 7), "输入名称搜索关卡",
+                      self.colors["locked"], is_center=False, font_size=18)
+        if self.results is not None:
+            show_text(self.screen, (self.search_rect.right - 70, self.search_rect.y + 8), f"{len(self.results)}个",
+                      self.colors["text_normal"], is_center=False, font_size=16)
+
+        mx, my = pygame.mouse.get_pos()
+        difficulty_color = self.colors["btn_hover"] if self.difficulty_btn.collidepoint(mx, my) else \
+            self.colors["btn_normal"]
+        difficulty_name = "全部" if self.difficulty is None else DIFFICULTIES[self.difficulty]
+        draw_button(self.screen, self.difficulty_btn, f"难度: {difficulty_name}", difficulty_color)
+
+    def handle_search_key(self, event):
+        """搜索框输入：字符追加，退格删除，Esc清空"""
+        if event.key == pygame.K_BACKSPACE:
+            self.search_text = self.search_text[:-1]
+        elif event.key == pygame.K_ESCAPE:
+            self.search_text = ""
+        elif event.unicode and event.unicode.isprintable() and len(self.search_text) < 20:
+            self.search_text += event.unicode
+        else:
+            return
+        self.update_results()
+
     def handle_events(self) -> Optional[Tuple[str, str]]:
         """处理关卡选择界面事件"""
         mx, my = pygame.mouse.get_pos()
@@ -155,6 +254,17 @@ class LevelSelect:
                     if next_state == "LEVEL_SELECT":
                         return ("LEVEL_SELECT", "")  # 刷新关卡列表
 
+                # 难度筛选按钮：全部 -> 简单 -> ... -> 极限 -> 全部
+                if self.difficulty_btn.collidepoint(mx, my):
+                    if self.difficulty is None:
+                        self.difficulty = 0
+                    elif self.difficulty < len(DIFFICULTIES) - 1:
+                        self.difficulty += 1
+                    else:
+                        self.difficulty = None
+                    self.update_results()
+                    return None
+
                 # 点击关卡卡片进入游戏
                 for idx, level in enumerate(visible_levels):
                     row = idx // self.cards_per_row
@@ -165,18 +275,17 @@ class LevelSelect:
                     y = 100 + row * (self.card_height + self.card_spacing)
                     card_rect = pygame.Rect(x, y, self.card_width, self.card_height)
                     if card_rect.collidepoint(mx, my):
-                        return ("PLAY_LEVEL", level["level_id"])
+                        return ("PLAY_LEVEL", level.level_id)
 
                 # 滚动控制（点击滚动指示器）
                 if has_scroll:
-                    total_pages = (len(self.level_manager.get_all_levels()) + self.cards_per_row * 2 - 1) // (
-                                self.cards_per_row * 2)
+                    total_pages = self.get_total_pages()
                     indicator_width = 100
                     indicator_x = self.screen_width // 2 - indicator_width // 2
                     indicator_y = self.screen_height - 50
                     indicator_rect = pygame.Rect(indicator_x, indicator_y, indicator_width, 8)
                     if indicator_rect.collidepoint(mx, my):
-                        page = (mx - indicator_x) // (indicator_width // total_pages)
+                        page = (mx - indicator_x) * total_pages // indicator_width
                         self.scroll_offset = max(0, min(total_pages - 1, page))
 
             # 滚轮控制滚动
@@ -184,14 +293,22 @@ class LevelSelect:
                 if event.button == 4 and has_scroll:  # 上滚
                     self.scroll_offset = max(0, self.scroll_offset - 1)
                 elif event.button == 5 and has_scroll:  # 下滚
-                    total_pages = (len(self.level_manager.get_all_levels()) + self.cards_per_row * 2 - 1) // (
-                                self.cards_per_row * 2)
+                    total_pages = self.get_total_pages()
                     self.scroll_offset = min(total_pages - 1, self.scroll_offset + 1)
 
+            if event.type == pygame.KEYDOWN:
+                self.handle_search_key(event)
+
         return None
 
     def run(self):
         """运行关卡选择界面主循环"""
+        # 关卡可能在编辑器中新增过：检查目录是否需要更新（未变化时只读一行元数据）
+        self.catalog.refresh()
+        self.thumbnails.retry_failed()
+        if self.results is not None:
+            self.results = self.catalog.query(self.search_text, self.difficulty)
+        self.scroll_offset = min(self.scroll_offset, self.get_total_pages() - 1)
         while True:
             self.draw_ui()
             next_state = self.handle_events()
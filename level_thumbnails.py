@@ -0,0 +1,161 @@
+# level_thumbnails.py - 关卡缩略图：后台线程绘制障碍物小地图并保存到本地缓存目录，关卡选择界面按需加载
+#
+# 缓存文件名由障碍物哈希、主题颜色和缩略图尺寸计算得到，关卡或主题变化后自然使用新文件，
+# 同样的障碍物（例如复制出来的自定义关卡）共用一张图。
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict
+from itertools import count
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import pygame
+
+from config import SCREEN_X, SCREEN_Y
+from level_catalog import LevelCatalog, LevelHeader, obstacle_hash
+
+THUMBNAIL_DIR = "thumbnails"
+# 缩略图尺寸（与游戏区域同比例）
+THUMBNAIL_SIZE = (80, 60)
+# 内存中保留的缩略图数量
+MEMORY_CACHE_SIZE = 128
+# 缩略图格式变化时加1，旧缓存文件不再使用
+_FORMAT_VERSION = 1
+# 障碍物颜色：与游戏中关卡背景的障碍物一致（GameState.colors["text_warning"]，不随主题变化）
+OBSTACLE_COLOR = (180, 60, 60)
+
+# 请求优先级：可见卡片先于预取
+PRIORITY_VISIBLE = 0
+PRIORITY_PREFETCH = 1
+
+
+def thumbnail_key(obstacles_hash: str, colors: Dict[str, tuple], size: Tuple[int, int] = THUMBNAIL_SIZE) -> str:
+    """缩略图缓存的键：障碍物哈希 + 用到的颜色 + 尺寸"""
+    data = f"{_FORMAT_VERSION}|{obstacles_hash}|{tuple(colors['game_bg'])}|{OBSTACLE_COLOR}|{size}"
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:24]
+
+
+def render_thumbnail(obstacles, colors: Dict[str, tuple], size: Tuple[int, int] = THUMBNAIL_SIZE) -> pygame.Surface:
+    """把关卡障碍物按比例缩小画到一张小图上（不依赖显示模式，可以在后台线程调用）
+
+    颜色与游戏中的关卡背景（GameState.level_background）一致：背景取自主题，障碍物为OBSTACLE_COLOR。
+    """
+    surface = pygame.Surface(size)
+    surface.fill(colors["game_bg"])
+    sx, sy = size[0] / SCREEN_X, size[1] / SCREEN_Y
+    for x, y, w, h in obstacles:
+        rect = pygame.Rect(round(x * sx), round(y * sy), max(1, round(w * sx)), max(1, round(h * sy)))
+        surface.fill(OBSTACLE_COLOR, rect)
+    return surface
+
+
+class ThumbnailCache:
+    """缩略图缓存：内存LRU -> 缓存目录中的PNG -> 后台线程绘制
+
+    get/prefetch只在主线程调用；后台线程读取或绘制完成后把结果放进结果队列，
+    下一次get时取回，所以卡片会在图准备好后的下一帧出现。
+    """
+
+    def __init__(self, catalog: LevelCatalog, cache_dir: str = THUMBNAIL_DIR, size: Tuple[int, int] = THUMBNAIL_SIZE):
+        # 缓存目录中没有这张图时，后台线程从目录中按下标读取这个关卡的障碍物
+        self.catalog = catalog
+        self.cache_dir = cache_dir
+        self.size = size
+        self._surfaces: "OrderedDict[str, pygame.Surface]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()
+        self._requests = queue.PriorityQueue()
+        self._results = queue.Queue()
+        self._order = count()  # 同优先级按提交顺序处理
+        self._thread = None
+        self.rendered = 0
+        self.loaded = 0
+
+    # ---------- 主线程 ----------
+    def get(self, header: LevelHeader, colors: Dict[str, tuple]) -> Optional[pygame.Surface]:
+        """返回关卡的缩略图；还没准备好时提交给后台线程并返回None"""
+        self._collect()
+        key = thumbnail_key(header.obstacle_hash, colors, self.size)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        self._request(key, header, colors, PRIORITY_VISIBLE)
+        return None
+
+    def prefetch(self, headers: Iterable[LevelHeader], colors: Dict[str, tuple]):
+        """提前准备即将显示的缩略图（例如下一页）"""
+        for header in headers:
+            key = thumbnail_key(header.obstacle_hash, colors, self.size)
+            if key not in self._surfaces:
+                self._request(key, header, colors, PRIORITY_PREFETCH)
+
+    def _request(self, key: str, header: LevelHeader, colors: Dict[str, tuple], priority: int):
+        if key in self._pending or key in self._failed:
+            return
+        self._pending.add(key)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="level-thumbnails", daemon=True)
+            self._thread.start()
+        self._requests.put((priority, next(self._order), key, header, dict(colors)))
+
+    def _collect(self):
+        """取回后台线程完成的缩略图"""
+        while True:
+            try:
+                key, surface, failed = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._pending.discard(key)
+            if failed:
+                self._failed.add(key)
+            if surface is None:
+                continue
+            self._surfaces[key] = surface
+            if len(self._surfaces) > MEMORY_CACHE_SIZE:
+                self._surfaces.popitem(last=False)
+
+    def retry_failed(self):
+        """允许重新生成之前失败的缩略图（关卡目录更新后调用）"""
+        self._failed.clear()
+
+    def get_stats(self):
+        return {"memory": len(self._surfaces), "pending": len(self._pending), "loaded": self.loaded,
+                "rendered": self.rendered}
+
+    # ---------- 后台线程 ----------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".png")
+
+    def _run(self):
+        while True:
+            _, _, key, header, colors = self._requests.get()
+            surface = None
+            failed = False
+            try:
+                path = self._path(key)
+                if os.path.exists(path):
+                    surface = pygame.image.load(path)
+                    self.loaded += 1
+                else:
+                    obstacles = self.catalog.read_obstacles(header.index)
+                    # 目录在请求之后重建过（下标对应了别的关卡）时不画，等界面按新的摘要重新请求
+                    if obstacle_hash(obstacles) == header.obstacle_hash:
+                        surface = render_thumbnail(obstacles, colors, self.size)
+                        self._save(path, surface)
+                        self.rendered += 1
+            except Exception as e:
+                print(f"生成关卡缩略图失败 {header.level_id}: {e}")
+                failed = True
+            self._results.put((key, surface, failed))
+
+    def _save(self, path: str, surface: pygame.Surface):
+        """先写临时文件再改名，读到的缓存文件总是完整的"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path[:-len(".png")] + ".tmp.png"  # 扩展名决定保存格式
+            pygame.image.save(surface, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"保存关卡缩略图失败: {e}")
@@ -0,0 +1,186 @@
+# persistence.py - 后台写盘：游戏结束时的分数、关卡成绩、成就、回放写入排队交给后台线程，
+# 渲染线程只负责把数据序列化后放进队列
+#
+# 整文件写入（JSON、回放）先写临时文件再原子替换，同一文件排队中的多次写入只写最后一次；
+# 追加写入（scores.txt）按顺序合并成一次写入；其他需要在后台执行的操作（如打开和写分数库）
+# 与文件写入一起按提交顺序执行：执行时之前提交的写入已经完成，之后提交的还没有开始。
+import atexit
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from config import PERSIST_FSYNC, PERSIST_QUEUE_SIZE
+
+# fsync策略：
+#   "never" 只写入系统缓存，由操作系统决定何时落盘（断电可能丢失最近的记录）
+#   "file"  每批写入后对写过的文件调用fsync
+#   "full"  同"file"，并在原子替换后对所在目录调用fsync，保证改名本身也已落盘
+FSYNC_POLICIES = ("never", "file", "full")
+
+_REPLACE = "replace"
+_APPEND = "append"
+_CALL = "call"
+
+
+class WriteBehindQueue:
+    """单个后台线程顺序处理写入请求；队列满时提交方阻塞等待（不丢弃数据）"""
+
+    def __init__(self, maxsize: int = PERSIST_QUEUE_SIZE, fsync: str = PERSIST_FSYNC):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"未知的fsync策略: {fsync}")
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.coalesced = 0
+
+    def _ensure_thread(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+                self.thread.start()
+
+    def _put(self, item):
+        self._ensure_thread()
+        self.queue.put(item)
+
+    def write_file(self, path: str, data: bytes):
+        """整文件写入（临时文件+原子替换），排队中对同一文件的旧写入会被跳过"""
+        self._put((_REPLACE, path, bytes(data)))
+
+    def append_file(self, path: str, data: bytes):
+        """追加写入文件末尾"""
+        self._put((_APPEND, path, bytes(data)))
+
+    def submit(self, func, *args):
+        """在后台线程中执行func(*args)（之前提交的写入完成后、之后提交的写入开始前执行）"""
+        self._put((_CALL, func, args))
+
+    def flush(self):
+        """等待已排队的写入全部完成（在后台线程中调用时直接返回：之前提交的写入已经完成，等待会死锁）"""
+        if self.thread is not None and self.thread.is_alive() and threading.current_thread() is not self.thread:
+            self.queue.join()
+
+    def get_stats(self):
+        return {"batches": self.batches, "writes": self.writes, "coalesced": self.coalesced,
+                "pending": self.queue.qsize()}
+
+    # ---------- 后台线程 ----------
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            # 把已经排队的请求一次取完，合并成一批
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(items)
+            except Exception as e:
+                print(f"后台写入失败: {e}")
+            finally:
+                for _ in items:
+                    self.queue.task_done()
+
+    def _write_batch(self, items):
+        # 路径 -> [方式, 内容]；替换之后的追加直接拼到替换内容后面
+        files = OrderedDict()
+        for kind, target, payload in items:
+            if kind == _CALL:
+                # 先写完之前合并的文件，保证任务看到的文件与提交时的顺序一致
+                self._write_files(files)
+                files.clear()
+                try:
+                    target(*payload)
+                except Exception as e:
+                    print(f"后台任务执行失败: {e}")
+                continue
+            pending = files.get(target)
+            if pending is None:
+                files[target] = [kind, bytearray(payload)]
+            elif kind == _REPLACE:
+                files[target] = [kind, bytearray(payload)]
+                self.coalesced += 1
+            else:
+                pending[1] += payload
+                self.coalesced += 1
+        self._write_files(files)
+        self.batches += 1
+
+    def _write_files(self, files):
+        for path, (kind, data) in files.items():
+            try:
+                if kind == _REPLACE:
+                    self._replace(path, data)
+                else:
+                    self._append(path, data)
+                self.writes += 1
+            except Exception as e:
+                print(f"写入文件失败 {path}: {e}")
+
+    def _replace(self, path: str, data: bytes):
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            if self.fsync != "never":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        if self.fsync == "full":
+            _fsync_dir(directory)
+
+    def _append(self, path: str, data: bytes):
+        with open(path, "ab") as f:
+            f.write(data)
+            if self.fsync != "never":
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def _fsync_dir(directory: str):
+    """对目录调用fsync（Windows不支持打开目录，直接跳过）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+_writer = WriteBehindQueue()
+# 退出时（包括sys.exit）等待排队的写入完成
+atexit.register(_writer.flush)
+
+
+def write_file(path: str, data: bytes):
+    _writer.write_file(path, data)
+
+
+def write_text(path: str, text: str):
+    _writer.write_file(path, text.encode("utf-8"))
+
+
+def append_text(path: str, text: str):
+    _writer.append_file(path, text.encode("utf-8"))
+
+
+def submit(func, *args):
+    _writer.submit(func, *args)
+
+
+def flush():
+    _writer.flush()
+
+
+def get_stats():
+    return _writer.get_stats()
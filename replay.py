@@ -0,0 +1,134 @@
+# replay.py - 对局回放：只记录随机种子和(模拟帧, 方向)输入流，可完全重现一局游戏
+import os
+import struct
+from typing import List, Optional, Tuple
+
+import persistence
+import simulation
+from simulation import MODE_CLASSIC, MODE_EVOLUTION
+
+# 回放文件目录（与scores.txt放在同一目录下）
+REPLAY_DIR = "replays"
+REPLAY_EXT = ".rpl"
+
+# 文件头：魔数、版本、模式、种子、列数、行数、最终分数、最终模拟帧、输入条数
+_MAGIC = b"SNKR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBBQHHiII")
+# 只有写入排行榜的经典/进化模式需要回放（闯关超时按实际时间判定，无法按帧重现）
+_MODE_IDS = {MODE_CLASSIC: 0, MODE_EVOLUTION: 1}
+_MODE_NAMES = {mode_id: mode for mode, mode_id in _MODE_IDS.items()}
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """一局游戏的回放数据"""
+
+    def __init__(self, mode: str, seed: int, cols: int, rows: int,
+                 inputs: Optional[List[Tuple[int, int]]] = None, score: int = 0, ticks: int = 0):
+        self.mode = mode
+        self.seed = seed
+        self.cols = cols
+        self.rows = rows
+        self.inputs = inputs if inputs is not None else []  # [(模拟帧, 方向)]，按帧递增
+        self.score = score
+        self.ticks = ticks
+
+    def to_bytes(self) -> bytes:
+        """编码为二进制：每条输入为一个varint(帧间隔<<2 | 方向)，通常1~2字节"""
+        out = bytearray(_HEADER.pack(_MAGIC, _VERSION, _MODE_IDS[self.mode], self.seed,
+                                     self.cols, self.rows, self.score, self.ticks, len(self.inputs)))
+        last_tick = 0
+        for tick, direction in self.inputs:
+            _write_varint(out, (tick - last_tick) << 2 | direction)
+            last_tick = tick
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        magic, version, mode_id, seed, cols, rows, score, ticks, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("不是有效的回放文件")
+        inputs = []
+        pos = _HEADER.size
+        tick = 0
+        for _ in range(count):
+            value, pos = _read_varint(data, pos)
+            tick += value >> 2
+            inputs.append((tick, value & 0x3))
+        return cls(_MODE_NAMES[mode_id], seed, cols, rows, inputs, score, ticks)
+
+
+class ReplayRecorder:
+    """对局进行中记录输入，结束时连同最终结果写入回放文件"""
+
+    def __init__(self, state: simulation.SimState, seed: int):
+        self.replay = Replay(state.mode, seed, state.cols, state.rows)
+
+    def record(self, tick: int, direction: int):
+        """记录在第tick个模拟帧生效的方向输入"""
+        self.replay.inputs.append((tick, direction))
+
+    def save(self, path: str, score: int, ticks: int):
+        self.replay.score = score
+        self.replay.ticks = ticks
+        # 编码在当前线程完成（录制器之后会被新的一局替换），写盘交给后台线程
+        try:
+            data = self.replay.to_bytes()
+        except Exception as e:
+            print(f"保存回放失败: {e}")
+            return
+        persistence.write_file(path, data)
+
+
+def replay_id(seed: int) -> str:
+    """回放编号（会话种子的十六进制），写在scores.txt记录的第4个字段"""
+    return f"{seed:x}"
+
+
+def replay_path(end_time: str, replay_dir: str = REPLAY_DIR, rid: Optional[str] = None) -> str:
+    """按scores.txt中的结束时间和回放编号生成回放文件路径（如 replays/20251028-154441-1f3a.rpl）
+
+    结束时间只精确到秒，同一秒结束的两局靠回放编号区分；没有编号的旧记录只用结束时间。
+    """
+    stamp = end_time.replace("-", "").replace(":", "").replace(" ", "-")
+    if rid is not None:
+        stamp += "-" + rid
+    return os.path.join(replay_dir, stamp + REPLAY_EXT)
+
+
+def load_replay(path: str) -> Replay:
+    with open(path, "rb") as f:
+        return Replay.from_bytes(f.read())
+
+
+def simulate(replay: Replay) -> simulation.SimState:
+    """按种子和输入流重新模拟整局（无界面），返回结束时的状态"""
+    state = simulation.new_game(replay.mode, replay.cols * simulation.CELL_SIZE,
+                                replay.rows * simulation.CELL_SIZE, seed=replay.seed)
+    inputs = iter(replay.inputs)
+    next_input = next(inputs, None)
+    while not state.over and state.tick < replay.ticks:
+        action = None
+        if next_input is not None and next_input[0] == state.tick + 1:
+            action = next_input[1]
+            next_input = next(inputs, None)
+        simulation.step(state, action)
+    return state
@@ -0,0 +1,104 @@
+# replay_verify.py - 批量校验排行榜：用回放文件在多进程中无界面重新模拟，核对scores.txt中的分数
+# 用法: python replay_verify.py [--scores scores.txt] [--replays replays] [--workers N] [--allow-legacy] [--verbose]
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from replay import REPLAY_DIR, load_replay, replay_path, simulate
+from score_manage import parse_replay_id, parse_score_line
+
+# 校验结果
+VERIFIED = "verified"      # 回放重现的分数与记录一致
+MISMATCH = "mismatch"      # 回放重现的分数不一致，或回放在死亡前就结束了
+NO_REPLAY = "no_replay"    # 记录带回放编号，但找不到对应的回放文件
+LEGACY = "legacy"          # 旧格式记录：没有回放编号也没有回放（录制回放之前写入，或被删掉了编号）
+CORRUPT = "corrupt"        # 回放文件损坏，无法解析
+
+# 每个工作进程一次领取的记录数（记录数上万时减少进程间通信开销）
+_CHUNK_SIZE = 64
+
+
+def load_entries(scores_file: str, replay_dir: str) -> List[Tuple[int, str, int, str]]:
+    """读取scores.txt，返回[(行号, 原始行, 记录分数, 回放路径, 是否带回放编号)]，格式错误的行直接跳过"""
+    entries = []
+    with open(scores_file, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                score, _, date_str = parse_score_line(line)
+            except ValueError as e:
+                print(f"第{line_no}行格式错误（{e}），跳过：{line}")
+                continue
+            rid = parse_replay_id(line)
+            entries.append((line_no, line, score, replay_path(date_str, replay_dir, rid), rid is not None))
+    return entries
+
+
+def verify_entry(entry: Tuple[int, str, int, str, bool]) -> Tuple[int, str, str, int]:
+    """重新模拟一条记录（在工作进程中执行），返回(行号, 原始行, 校验结果, 重现分数)"""
+    line_no, line, score, path, has_id = entry
+    if not os.path.exists(path):
+        return line_no, line, NO_REPLAY if has_id else LEGACY, 0
+    try:
+        replay = load_replay(path)
+        state = simulate(replay)
+    except Exception:
+        return line_no, line, CORRUPT, 0
+    # 分数写入排行榜时一定是死亡后，回放必须以死亡结束且分数一致
+    status = VERIFIED if state.dead and state.score == score else MISMATCH
+    return line_no, line, status, state.score
+
+
+def verify_scores(scores_file: str = "scores.txt", replay_dir: str = REPLAY_DIR, workers: int = None):
+    """用进程池校验所有记录，返回{校验结果: [(行号, 原始行, 重现分数)]}"""
+    entries = load_entries(scores_file, replay_dir)
+    results = {VERIFIED: [], MISMATCH: [], NO_REPLAY: [], LEGACY: [], CORRUPT: []}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for line_no, line, status, replayed in pool.map(verify_entry, entries, chunksize=_CHUNK_SIZE):
+            results[status].append((line_no, line, replayed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用回放文件校验scores.txt中的分数")
+    parser.add_argument("--scores", default="scores.txt", help="分数记录文件")
+    parser.add_argument("--replays", default=REPLAY_DIR, help="回放文件目录")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认等于CPU核数）")
+    parser.add_argument("--allow-legacy", action="store_true",
+                        help="不把没有回放编号的旧格式记录算作校验失败（录制回放之前的分数文件）")
+    parser.add_argument("--verbose", action="store_true", help="逐条列出没有回放的记录内容")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.scores):
+        print(f"找不到分数文件: {args.scores}")
+        return 1
+    results = verify_scores(args.scores, args.replays, args.workers)
+
+    for line_no, line, replayed in results[MISMATCH]:
+        print(f"分数不一致 第{line_no}行: {line}（回放重现分数 {replayed}）")
+    for line_no, line, _ in results[CORRUPT]:
+        print(f"回放损坏 第{line_no}行: {line}")
+    # 没有回放的记录无法证明分数真实，总是列出行号（删掉回放编号伪造的记录就属于旧格式这一类）
+    for status, label in ((NO_REPLAY, "回放文件缺失的行"), (LEGACY, "旧格式（没有回放编号）的行")):
+        if results[status]:
+            line_nos = "、".join(str(line_no) for line_no, _, _ in results[status])
+            print(f"{label}: {line_nos}")
+    if args.verbose:
+        for line_no, line, _ in results[NO_REPLAY] + results[LEGACY]:
+            print(f"没有回放 第{line_no}行: {line}")
+
+    print(f"校验通过 {len(results[VERIFIED])} 条，分数不一致 {len(results[MISMATCH])} 条，"
+          f"回放损坏 {len(results[CORRUPT])} 条，回放缺失 {len(results[NO_REPLAY])} 条，"
+          f"旧格式 {len(results[LEGACY])} 条")
+    if results[MISMATCH] or results[CORRUPT] or results[NO_REPLAY]:
+        return 1
+    # 游戏写入的记录都带回放编号，旧格式记录只在明确允许时放过
+    return 0 if args.allow_legacy or not results[LEGACY] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,235 @@
 import os
+import threading
+from bisect import bisect_right
 
+import numpy as np
 
-def save_score(score_data):
-    """保存分数数据到文件"""
+import persistence
+from score_store import MODE_IDS, ScoreColumns, ScoreStore, date_to_epoch
+
+SCORES_FILE = "scores.txt"
+
+
+def save_score(score_data, mode="unknown"):
+    """保存分数数据（文本记录和二进制分数库各写一份，打开分数库和写盘都由后台线程完成）"""
     try:
-        with open("scores.txt", "a", encoding="utf-8") as f:
-            f.write(score_data + "\n")
-    except Exception as e:
-        print(f"保存分数失败: {e}")
+        score, time_str, date_str = parse_score_line(score_data)
+        # 先提交分数库的写入：分数库还没打开时在后台线程打开并从scores.txt迁移，
+        # 这时这一条还没追加到scores.txt，不会迁移进去后再追加一次
+        persistence.submit(_append_to_store, score, int(time_str), date_to_epoch(date_str),
+                           MODE_IDS.get(mode, 0))
+    except ValueError as e:
+        print(f"写入分数库失败: {e}")
+    # 排行榜下次读取时只解析新追加的这一行（后台写完之前读到的半行会留到下次）
+    persistence.append_text(SCORES_FILE, score_data + "\n")
 
-def get_rankings():
-    rankings = []
-    if not os.path.exists("scores.txt"):
-        return rankings
+
+def _append_to_store(score, seconds, epoch, mode):
+    """在后台线程中执行"""
+    store = get_score_store()
+    if store is None:
+        return
     try:
-        with open("scores.txt", "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    parts = line.split(",")
-                    # 1. 确保是3个字段
-                    if len(parts) != 3:
-                        print(f"跳过无效数据（字段数错误）：{line}")
-                        continue
-                    score_str, time_str, date_str = parts
-                    # 2. 校验分数是整数
-                    try:
-                        score = int(score_str)
-                    except ValueError:
-                        print(f"跳过无效数据（分数非整数）：{line}")
-                        continue
-                    # 3. 校验时间是整数（秒数）
-                    try:
-                        time = int(time_str)  # 确保时间是纯数字秒数
-                    except ValueError:
-                        print(f"跳过无效数据（时间非整数）：{line}")
-                        continue
-                    # 4. 简单校验日期格式（至少包含“-”）
-                    if "-" not in date_str:
-                        print(f"跳过无效数据（日期格式错误）：{line}")
-                        continue
-                    rankings.append((score, time_str, date_str))  # 注意：time_str保留原字符串，后续分析时再转int
-        rankings.sort(reverse=True, key=lambda x: x[0])
-        return rankings
+        store.append(score, seconds, epoch, mode)
     except Exception as e:
-        print(f"读取排行榜失败: {e}")
-        return []
\ No newline at end of file
+        print(f"写入分数库失败: {e}")
+
+def parse_score_line(line):
+    """解析scores.txt中的一行，返回(分数, 时间字符串, 日期字符串)，格式错误时抛出ValueError
+
+    有回放的记录带第4个字段：回放编号（十六进制的会话种子），用parse_replay_id读取。
+    """
+    parts = line.split(",")
+    # 1. 确保是3个字段（或带回放编号的4个字段）
+    if len(parts) not in (3, 4):
+        raise ValueError("字段数错误")
+    if len(parts) == 4:
+        try:
+            int(parts[3], 16)
+        except ValueError:
+            raise ValueError("回放编号错误")
+    score_str, time_str, date_str = parts[:3]
+    # 2. 校验分数是整数
+    try:
+        score = int(score_str)
+    except ValueError:
+        raise ValueError("分数非整数")
+    # 3. 校验时间是整数（秒数）
+    try:
+        int(time_str)  # 确保时间是纯数字秒数
+    except ValueError:
+        raise ValueError("时间非整数")
+    # 4. 简单校验日期格式（至少包含“-”）
+    if "-" not in date_str:
+        raise ValueError("日期格式错误")
+    return score, time_str, date_str  # 注意：time_str保留原字符串，后续分析时再转int
+
+
+def parse_replay_id(line):
+    """scores.txt中一行记录的回放编号，旧记录没有编号时返回None"""
+    parts = line.split(",")
+    return parts[3] if len(parts) == 4 else None
+
+class Leaderboard:
+    """内存中的排行榜：启动时完整读取一次scores.txt，之后只解析文件末尾新追加的行
+
+    entries按分数从高到低排列，同分按写入先后排列（与原来每次整体排序的结果一致）。
+    新记录用bisect插入到对应位置，不需要重新排序。
+    """
+
+    def __init__(self, path=SCORES_FILE):
+        self.path = path
+        self.entries = []  # [(分数, 时间字符串, 日期字符串)]
+        self._keys = []  # 与entries一一对应的-分数，升序，用于bisect
+        self._offset = 0  # 已解析到的文件字节位置
+        self._mtime = None  # 上次解析时文件的修改时间
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry):
+        """插入一条记录（同分时排在已有记录之后）"""
+        key = -entry[0]
+        index = bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self.entries.insert(index, entry)
+
+    def _reset(self):
+        self.entries = []
+        self._keys = []
+        self._offset = 0
+        self._mtime = None
+
+    def refresh(self):
+        """检查文件变化：追加的内容只解析新增部分，被截断或改写过则整体重新读取"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._reset()
+            return
+        if stat.st_size < self._offset or (stat.st_size == self._offset and stat.st_mtime != self._mtime):
+            self._reset()
+        if stat.st_size == self._offset:
+            self._mtime = stat.st_mtime
+            return
+        try:
+            with open(self.path, "rb") as f:
+                # 上次读到的位置必须紧跟在换行符之后，否则文件被改写过，需要整体重新读取
+                if self._offset:
+                    f.seek(self._offset - 1)
+                    if f.read(1) != b"\n":
+                        self._reset()
+                f.seek(self._offset)
+                data = f.read()
+        except Exception as e:
+            print(f"读取排行榜失败: {e}")
+            return
+        # 只处理完整的行（正在写入的半行留到下次）
+        end = data.rfind(b"\n") + 1
+        new_entries = []
+        for raw in data[:end].decode("utf-8", errors="replace").splitlines():
+            line = raw.strip()
+            if line:
+                try:
+                    new_entries.append(parse_score_line(line))
+                except ValueError as e:
+                    print(f"跳过无效数据（{e}）：{line}")
+        if self._offset == 0:
+            # 整体读取时排序一次，之后的新记录逐条插入
+            new_entries.sort(reverse=True, key=lambda x: x[0])
+            self.entries = new_entries
+            self._keys = [-entry[0] for entry in new_entries]
+        else:
+            for entry in new_entries:
+                self.add(entry)
+        self._offset += end
+        self._mtime = stat.st_mtime
+
+
+_leaderboard = None
+
+
+def get_leaderboard():
+    """获取全局排行榜（首次调用时加载，之后只增量更新）"""
+    global _leaderboard
+    if _leaderboard is None:
+        _leaderboard = Leaderboard()
+    _leaderboard.refresh()
+    return _leaderboard
+
+
+def get_rankings():
+    """按分数从高到低返回所有记录的副本"""
+    return list(get_leaderboard().entries)
+
+
+_score_store = None
+_score_store_lock = threading.Lock()
+
+
+def read_legacy_records(legacy_path=SCORES_FILE):
+    """按文件顺序逐行读取scores.txt，生成(分数, 秒数, 结束时间戳, 模式)（文本记录不含模式，都记为unknown）"""
+    with open(legacy_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                score, time_str, date_str = parse_score_line(line)
+                yield score, int(time_str), date_to_epoch(date_str), MODE_IDS["unknown"]
+            except ValueError:
+                continue  # 无效行在读取排行榜时会提示
+
+
+def migrate_legacy_scores(store, legacy_path=SCORES_FILE):
+    """把scores.txt逐行流式迁移到二进制分数库（只在分数库为空时执行），返回迁移的条数"""
+    if len(store) or not os.path.exists(legacy_path):
+        return 0
+    store.append_many(read_legacy_records(legacy_path))
+    if len(store):
+        print(f"已从 {legacy_path} 迁移 {len(store)} 条分数记录到 {store.path}")
+    return len(store)
+
+
+def get_score_store():
+    """获取二进制分数库（首次调用时打开，分数库为空时从scores.txt迁移），打开失败返回None
+
+    主线程和后台写盘线程都可能调用，只有一个线程执行打开和迁移。
+    """
+    global _score_store
+    if _score_store is None:
+        # 迁移前等排队中的scores.txt追加写完（后台线程中调用时之前的写入已经完成）
+        persistence.flush()
+        with _score_store_lock:
+            if _score_store is None:
+                try:
+                    store = ScoreStore()
+                    migrate_legacy_scores(store)
+                except Exception as e:
+                    print(f"打开分数库失败: {e}")
+                    return None
+                _score_store = store
+    return _score_store
+
+
+def get_score_columns():
+    """全部记录的分数、用时、结束时间戳、模式列（按写入顺序）
+
+    优先使用分数库的mmap视图（不复制）；分数库无法打开时按文件顺序读取scores.txt构造同样的数组。
+    """
+    store = get_score_store()
+    if store is not None:
+        return store.columns()
+    records = list(read_legacy_records()) if os.path.exists(SCORES_FILE) else []
+    rows = np.array(records, dtype=np.int64).reshape(-1, 4)
+    return ScoreColumns(rows[:, 0].astype(np.int32), rows[:, 1].astype(np.int32), rows[:, 2],
+                        rows[:, 3].astype(np.int32))
+
+
+def longest_run(mask: np.ndarray) -> int:
+    """布尔数组中最长的连续True长度"""
+    if not len(mask):
+        return 0
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
\ No newline at end of file
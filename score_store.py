@@ -0,0 +1,307 @@
+# score_store.py - 二进制分数库：定长记录只追加写入，另有按分数、按日期排序的索引文件
+#
+# scores.bin            文件头(魔数+版本) + 定长记录(分数int32, 用时秒数int32, 结束时间戳int64, 模式int32)
+# scores.by_score.idx   已索引的记录数uint32 + 按(-分数, 记录号)升序排列的(键int64, 记录号uint32)
+# scores.by_date.idx    同上，键为结束时间戳
+#
+# 索引只覆盖前N条记录，之后追加的记录（未索引的尾部）在查询时单独排序合并；
+# 尾部超过INDEX_MERGE_THRESHOLD条时把尾部归并进索引，归并是一次顺序读写。
+#
+# 游戏内只有数据分析和成就统计通过columns()读取分数库；排行榜和回放校验仍以scores.txt为准，
+# top/date_range供命令行工具等按分数、日期查询大量记录时使用。
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+STORE_FILE = "scores.bin"
+SCORE_INDEX_FILE = "scores.by_score.idx"
+DATE_INDEX_FILE = "scores.by_date.idx"
+
+_MAGIC = b"SNKS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sI")
+RECORD = struct.Struct("<iiqi")
+# 与RECORD布局相同的NumPy结构化类型（无对齐填充，每条20字节）
+RECORD_DTYPE = np.dtype([("score", "<i4"), ("seconds", "<i4"), ("epoch", "<i8"), ("mode", "<i4")])
+_INDEX_HEADER = struct.Struct("<I")
+_INDEX_ENTRY = struct.Struct("<qI")
+
+# 记录中的模式编号（迁移自scores.txt的旧记录不知道模式，记为0）
+MODE_IDS = {"unknown": 0, "classic": 1, "evolution": 2}
+# 未索引的尾部超过这么多条时归并进索引
+INDEX_MERGE_THRESHOLD = 256
+# 批量读写时每批的条数
+_BATCH = 4096
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def date_to_epoch(date_str: str) -> int:
+    """把scores.txt中的日期字符串（本地时间）转为时间戳"""
+    return int(time.mktime(time.strptime(date_str, DATE_FORMAT)))
+
+
+def epoch_to_date(epoch: int) -> str:
+    return time.strftime(DATE_FORMAT, time.localtime(epoch))
+
+
+class ScoreColumns(NamedTuple):
+    """按列访问的全部记录（写入顺序），都是映射到文件上的只读数组视图"""
+    score: np.ndarray
+    seconds: np.ndarray
+    epoch: np.ndarray
+    mode: np.ndarray
+
+
+class _IndexFile:
+    """按需读取的索引文件：二分查找时每次只读一条，不把整个索引读进内存"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "rb")
+        self.covered = _INDEX_HEADER.unpack(self.f.read(_INDEX_HEADER.size))[0]
+
+    def __len__(self):
+        return self.covered
+
+    def __getitem__(self, i: int) -> Tuple[int, int]:
+        self.f.seek(_INDEX_HEADER.size + i * _INDEX_ENTRY.size)
+        return _INDEX_ENTRY.unpack(self.f.read(_INDEX_ENTRY.size))
+
+    def iter_entries(self) -> Iterator[Tuple[int, int]]:
+        """分批顺序读取全部索引项"""
+        self.f.seek(_INDEX_HEADER.size)
+        remaining = self.covered
+        while remaining > 0:
+            batch = min(remaining, _BATCH)
+            yield from _INDEX_ENTRY.iter_unpack(self.f.read(batch * _INDEX_ENTRY.size))
+            remaining -= batch
+
+    def read_range(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """顺序读取[start, stop)之间的索引项"""
+        start, stop = max(0, start), min(stop, self.covered)
+        if start >= stop:
+            return []
+        self.f.seek(_INDEX_HEADER.size + start * _INDEX_ENTRY.size)
+        return list(_INDEX_ENTRY.iter_unpack(self.f.read((stop - start) * _INDEX_ENTRY.size)))
+
+    def bisect_left(self, key: int) -> int:
+        lo, hi = 0, self.covered
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self[mid][0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def close(self):
+        self.f.close()
+
+
+class ScoreStore:
+    """二进制分数库（查询前N名、按日期范围查询都是O(log n + k)）
+
+    追加在后台写盘线程中进行，查询在主线程中进行，公开方法都持有同一把锁。
+    """
+
+    def __init__(self, path: str = STORE_FILE, score_index: str = SCORE_INDEX_FILE,
+                 date_index: str = DATE_INDEX_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self.index_paths = {"score": score_index, "date": date_index}
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, _VERSION))
+        self.f = open(path, "r+b")
+        magic, version = _HEADER.unpack(self.f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不是有效的分数库文件: {path}")
+        # 上次写入中断留下的半条记录直接截掉
+        size = self.f.seek(0, os.SEEK_END)
+        self.count = (size - _HEADER.size) // RECORD.size
+        if _HEADER.size + self.count * RECORD.size != size:
+            self.f.truncate(_HEADER.size + self.count * RECORD.size)
+        self.indexes = {}
+        for name in self.index_paths:
+            self._open_index(name)
+        self._mmap = None
+        self._mapped_count = -1
+
+    # ---------- 记录读写 ----------
+    def __len__(self):
+        return self.count
+
+    def read_record(self, recno: int) -> Tuple[int, int, int, int]:
+        """读取第recno条记录：(分数, 用时秒数, 结束时间戳, 模式编号)"""
+        with self._lock:
+            return self._read_record(recno)
+
+    def _read_record(self, recno: int) -> Tuple[int, int, int, int]:
+        self.f.seek(_HEADER.size + recno * RECORD.size)
+        return RECORD.unpack(self.f.read(RECORD.size))
+
+    def iter_records(self, start: int = 0) -> Iterator[Tuple[int, int, int, int]]:
+        """从start开始顺序读取所有记录（调用方需持有锁）"""
+        self.f.seek(_HEADER.size + start * RECORD.size)
+        remaining = self.count - start
+        while remaining > 0:
+            batch = min(remaining, _BATCH)
+            yield from RECORD.iter_unpack(self.f.read(batch * RECORD.size))
+            remaining -= batch
+
+    def columns(self) -> ScoreColumns:
+        """通过mmap把全部记录映射为NumPy列（不复制数据，只有被访问的页才会读入内存）"""
+        with self._lock:
+            return self._columns()
+
+    def _columns(self) -> ScoreColumns:
+        if self._mmap is None or self._mapped_count != self.count:
+            # 旧的映射可能还被之前返回的数组引用，不主动关闭，由垃圾回收释放
+            self._mmap = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_count = self.count
+        records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE, count=self.count, offset=_HEADER.size)
+        return ScoreColumns(records["score"], records["seconds"], records["epoch"], records["mode"])
+
+    def append(self, score: int, seconds: int, epoch: int, mode: int = 0):
+        """追加一条记录（未索引的尾部过长时归并进索引）"""
+        with self._lock:
+            self.f.seek(0, os.SEEK_END)
+            self.f.write(RECORD.pack(score, seconds, epoch, mode))
+            self.f.flush()
+            self.count += 1
+            if self.count - len(self.indexes["score"]) > INDEX_MERGE_THRESHOLD:
+                self.merge_indexes()
+
+    def append_many(self, records):
+        """批量追加记录（可以是生成器，分批写入），最后统一归并索引"""
+        with self._lock:
+            self.f.seek(0, os.SEEK_END)
+            batch = bytearray()
+            for record in records:
+                batch += RECORD.pack(*record)
+                self.count += 1
+                if len(batch) >= _BATCH * RECORD.size:
+                    self.f.write(batch)
+                    batch.clear()
+            self.f.write(batch)
+            self.f.flush()
+            self.merge_indexes()
+
+    # ---------- 索引 ----------
+    @staticmethod
+    def _index_key(name: str, record) -> int:
+        return -record[0] if name == "score" else record[2]
+
+    def _open_index(self, name: str):
+        path = self.index_paths[name]
+        try:
+            index = _IndexFile(path)
+        except (OSError, struct.error):
+            index = None
+        # 索引文件丢失、损坏或覆盖的记录数多于实际记录时，从记录文件重建（否则之后每次查询都要排序全部记录）
+        if index is None or not self._index_valid(index, path):
+            if index is not None:
+                index.close()
+                print(f"分数库索引损坏，重建: {path}")
+            self._write_index(name, self._sorted_entries(name, 0), self.count)
+            index = _IndexFile(path)
+        self.indexes[name] = index
+
+    def _index_valid(self, index: _IndexFile, path: str) -> bool:
+        """检查文件大小与头部记录数一致，首尾两项的记录号有效且键有序（不逐项检查）"""
+        if len(index) > self.count or os.path.getsize(path) != _INDEX_HEADER.size + len(index) * _INDEX_ENTRY.size:
+            return False
+        if not len(index):
+            return True
+        first, last = index[0], index[len(index) - 1]
+        return first[1] < len(index) and last[1] < len(index) and first[0] <= last[0]
+
+    def _write_index(self, name: str, entries, covered: int, old: Optional[_IndexFile] = None):
+        """写入临时文件后原子替换，写到一半中断不会留下损坏的索引
+
+        entries可能正从旧索引old中读取，所以写完临时文件后才关闭old；
+        Windows上不能替换仍被打开的文件，必须先关闭再替换。
+        """
+        path = self.index_paths[name]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(covered))
+            batch = bytearray()
+            for entry in entries:
+                batch += _INDEX_ENTRY.pack(*entry)
+                if len(batch) >= _BATCH * _INDEX_ENTRY.size:
+                    f.write(batch)
+                    batch.clear()
+            f.write(batch)
+        if old is not None:
+            old.close()
+        os.replace(tmp_path, path)
+
+    def _sorted_entries(self, name: str, start: int) -> List[Tuple[int, int]]:
+        """从第start条开始的记录的索引项（已排序）"""
+        return sorted((self._index_key(name, record), recno)
+                      for recno, record in enumerate(self.iter_records(start), start))
+
+    def _tail_entries(self, name: str) -> List[Tuple[int, int]]:
+        """未索引尾部记录的索引项（已排序）"""
+        return self._sorted_entries(name, len(self.indexes[name]))
+
+    def merge_indexes(self):
+        """把未索引的尾部归并进两个索引（顺序读旧索引、顺序写新索引）"""
+        with self._lock:
+            for name in self.index_paths:
+                index = self.indexes[name]
+                if len(index) == self.count:
+                    continue
+                tail = self._tail_entries(name)
+                try:
+                    self._write_index(name, heapq.merge(index.iter_entries(), tail), self.count, old=index)
+                finally:
+                    # 替换失败时重新打开的仍是旧索引，尾部留到下次归并
+                    self.indexes[name] = _IndexFile(self.index_paths[name])
+
+    def _query(self, name: str, lo_key: Optional[int], hi_key: Optional[int], limit: Optional[int],
+               offset: int = 0) -> List[Tuple[int, int, int, int]]:
+        """按索引取键在[lo_key, hi_key)之间的记录，已索引部分二分定位，尾部单独合并"""
+        index = self.indexes[name]
+        start = index.bisect_left(lo_key) if lo_key is not None else 0
+        stop = index.bisect_left(hi_key) if hi_key is not None else len(index)
+        if limit is not None:
+            stop = min(stop, start + offset + limit)
+        indexed = index.read_range(start, stop)
+        tail = [entry for entry in self._tail_entries(name)
+                if (lo_key is None or entry[0] >= lo_key) and (hi_key is None or entry[0] < hi_key)]
+        merged = heapq.merge(indexed, tail)
+        result = []
+        for i, (_, recno) in enumerate(merged):
+            if i < offset:
+                continue
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self._read_record(recno))
+        return result
+
+    def top(self, n: int, offset: int = 0) -> List[Tuple[int, int, int, int]]:
+        """分数最高的n条记录（同分按写入先后）"""
+        with self._lock:
+            return self._query("score", None, None, n, offset)
+
+    def date_range(self, start_epoch: int, end_epoch: int, limit: Optional[int] = None):
+        """结束时间在[start_epoch, end_epoch)之间的记录，按时间先后"""
+        with self._lock:
+            return self._query("date", start_epoch, end_epoch, limit)
+
+    def close(self):
+        with self._lock:
+            for index in self.indexes.values():
+                index.close()
+            self._mmap = None
+            self.f.close()
+
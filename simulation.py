@@ -0,0 +1,433 @@
+# simulation.py - 无界面的贪吃蛇规则引擎（经典/闯关/进化三种规则）
+import random
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+# 网格大小（像素），屏幕按格子划分
+CELL_SIZE = 25
+
+# 方向定义（与pygame按键解耦，无界面时同样可用）
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+DIRECTION_VECTORS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+OPPOSITE = (DOWN, UP, RIGHT, LEFT)
+
+# 游戏模式
+MODE_CLASSIC = "classic"
+MODE_LEVEL = "level"
+MODE_EVOLUTION = "evolution"
+
+# 计分规则
+TICK_SCORE = 1  # 每帧加1分
+FOOD_SCORE = 50  # 吃到食物加50分
+
+# 进化阶段定义（规则数据，进化模式的界面也读取这份表）
+EVOLUTION_STAGES = [
+    {"name": "幼蛇", "color": (100, 200, 100), "speed": 8, "ability": None, "food_required": 5},
+    {"name": "成长蛇", "color": (50, 150, 50), "speed": 10, "ability": "加速", "food_required": 10},
+    {"name": "敏捷蛇", "color": (0, 100, 200), "speed": 12, "ability": "穿墙", "food_required": 15},
+    {"name": "火焰蛇", "color": (255, 100, 0), "speed": 14, "ability": "烧毁障碍", "food_required": 20},
+    {"name": "雷霆蛇", "color": (200, 200, 0), "speed": 16, "ability": "闪电移动", "food_required": 25},
+    {"name": "神龙", "color": (150, 0, 200), "speed": 18, "ability": "无敌", "food_required": 30},
+]
+
+# 进化能力对应的持续效果（能力名 -> (效果类型, 持续帧数)）
+ABILITY_EFFECTS = {
+    "加速": ("speed_boost", 180),
+    "闪电移动": ("lightning_move", 120),
+    "无敌": ("invincible", 300),
+}
+
+
+def obstacle_mask(obstacles: Sequence[Sequence[int]], cols: int, rows: int) -> bytearray:
+    """把像素障碍物(x, y, w, h)转换为格子掩码，与障碍物有重叠的格子为1"""
+    mask = bytearray(cols * rows)
+    for ox, oy, ow, oh in obstacles:
+        x0 = max(0, ox // CELL_SIZE)
+        y0 = max(0, oy // CELL_SIZE)
+        x1 = min(cols, -(-(ox + ow) // CELL_SIZE))
+        y1 = min(rows, -(-(oy + oh) // CELL_SIZE))
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                mask[y * cols + x] = 1
+    return mask
+
+
+class FreeCells:
+    """空闲格子集合：数组+位置表，随机取一个、加入、删除都是O(1)
+
+    删除时把数组末尾的元素换到被删位置（swap-remove），position[cell]记录
+    每个格子在数组中的下标，不在集合中为-1。障碍物格子永远不会加入集合。
+    """
+
+    def __init__(self, size: int, blocked: Optional[bytearray] = None):
+        self.blocked = blocked if blocked is not None else bytearray(size)
+        self.cells = [i for i in range(size) if not self.blocked[i]]
+        self.position = [-1] * size
+        for index, cell in enumerate(self.cells):
+            self.position[cell] = index
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell: int) -> bool:
+        return self.position[cell] >= 0
+
+    def add(self, cell: int):
+        if self.position[cell] >= 0 or self.blocked[cell]:
+            return
+        self.position[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    def remove(self, cell: int):
+        index = self.position[cell]
+        if index < 0:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[index] = last
+            self.position[last] = index
+        self.position[cell] = -1
+
+    def pick(self, rng: random.Random) -> Optional[int]:
+        """随机取一个空闲格子（不移除），没有空位时返回None"""
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+    def clone(self) -> "FreeCells":
+        other = FreeCells.__new__(FreeCells)
+        other.blocked = self.blocked
+        other.cells = list(self.cells)
+        other.position = list(self.position)
+        return other
+
+
+class SnakeBody:
+    """蛇身（格子坐标，body[0]为蛇头）
+
+    用两个整数数组组成的环形缓冲区保存坐标（head_index指向蛇头，length为节数），
+    移动时只改写一个位置，不再插入/弹出列表元素，也不创建矩形对象，
+    复制状态时只需拷贝数组。
+
+    同时维护一张占用表（每个格子一个计数），move/remove_tail时同步更新，
+    碰撞检测、食物放置等查询都是O(1)，不再扫描整条蛇身。格子从空变为占用
+    （或反过来）时同步更新free_cells。
+    """
+
+    def __init__(self, cells: Sequence[Tuple[int, int]], cols: int, rows: int,
+                 free_cells: Optional[FreeCells] = None):
+        self.cols = cols
+        self.rows = rows
+        capacity = max(cols * rows, len(cells)) + 1
+        self.xs = array("i", bytes(4 * capacity))
+        self.ys = array("i", bytes(4 * capacity))
+        self.head_index = -1
+        self.length = 0
+        self.occupancy = bytearray(cols * rows)
+        self.free_cells = free_cells if free_cells is not None else FreeCells(cols * rows)
+        # 从尾到头依次加入
+        for cell in reversed(cells):
+            self.move(cell)
+
+    def _mark(self, x: int, y: int, delta: int):
+        # 进化模式无敌时蛇可以移出屏幕，屏幕外的格子不计入占用表
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            index = y * self.cols + x
+            count = self.occupancy[index] + delta
+            self.occupancy[index] = count
+            if count == 0:
+                self.free_cells.add(index)
+            elif count == 1 and delta > 0:
+                self.free_cells.remove(index)
+
+    def _grow_buffer(self):
+        """缓冲区满时按从尾到头的顺序搬到两倍大小的新缓冲区"""
+        cells = list(self)[::-1]
+        capacity = len(self.xs) * 2
+        self.xs = array("i", bytes(4 * capacity))
+        self.ys = array("i", bytes(4 * capacity))
+        for i, (x, y) in enumerate(cells):
+            self.xs[i] = x
+            self.ys[i] = y
+        self.head_index = len(cells) - 1
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        xs, ys, capacity = self.xs, self.ys, len(self.xs)
+        index = self.head_index
+        for _ in range(self.length):
+            yield xs[index], ys[index]
+            index -= 1
+            if index < 0:
+                index += capacity
+
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("snake body index out of range")
+        position = (self.head_index - index) % len(self.xs)
+        return self.xs[position], self.ys[position]
+
+    @property
+    def head(self) -> Tuple[int, int]:
+        return self.xs[self.head_index], self.ys[self.head_index]
+
+    @property
+    def tail(self) -> Tuple[int, int]:
+        return self[self.length - 1]
+
+    def move(self, cell: Tuple[int, int]):
+        """在蛇头前方加一节（尾部是否移除由remove_tail决定）"""
+        if self.length == len(self.xs):
+            self._grow_buffer()
+        self.head_index += 1
+        if self.head_index == len(self.xs):
+            self.head_index = 0
+        x, y = cell
+        self.xs[self.head_index] = x
+        self.ys[self.head_index] = y
+        self.length += 1
+        self._mark(x, y, 1)
+
+    def remove_tail(self):
+        """移除尾部一节"""
+        position = (self.head_index - self.length + 1) % len(self.xs)
+        self.length -= 1
+        self._mark(self.xs[position], self.ys[position], -1)
+
+    def occupied(self, cell: Tuple[int, int]) -> bool:
+        """格子是否被蛇身占据（屏幕外的格子视为未占据）"""
+        x, y = cell
+        return 0 <= x < self.cols and 0 <= y < self.rows and self.occupancy[y * self.cols + x] > 0
+
+    def head_collides(self) -> bool:
+        """蛇头是否与自身其它部分重叠（蛇头所在格子被占用不止一次）"""
+        x, y = self.head
+        return 0 <= x < self.cols and 0 <= y < self.rows and self.occupancy[y * self.cols + x] > 1
+
+    def clone(self) -> "SnakeBody":
+        other = SnakeBody.__new__(SnakeBody)
+        other.cols = self.cols
+        other.rows = self.rows
+        other.xs = array("i", self.xs)
+        other.ys = array("i", self.ys)
+        other.head_index = self.head_index
+        other.length = self.length
+        other.occupancy = bytearray(self.occupancy)
+        other.free_cells = self.free_cells.clone()
+        return other
+
+
+class SimState:
+    """一局游戏的全部规则状态（不含任何绘制相关数据）"""
+
+    def __init__(self, mode: str, cols: int, rows: int,
+                 obstacles: Optional[Sequence[Sequence[int]]] = None,
+                 score_target: int = 0, seed: Optional[int] = None,
+                 blocked: Optional[bytes] = None):
+        self.mode = mode
+        self.cols = cols
+        self.rows = rows
+        # 障碍物格子掩码（只读，可直接使用关卡预编译好的掩码）
+        self.blocked = blocked if blocked is not None else bytes(obstacle_mask(obstacles or [], cols, rows))
+        self.score_target = score_target
+        self.rng = random.Random(seed)
+
+        # 空闲格子索引（先排除障碍物），由蛇身移动时维护
+        self.free_cells = FreeCells(cols * rows, self.blocked)
+
+        # 初始蛇：左上角5节，向右移动
+        self.body = SnakeBody([(x, 0) for x in range(5, 0, -1)], cols, rows, self.free_cells)
+        self.direction = RIGHT
+        self.food: Optional[Tuple[int, int]] = None
+
+        self.score = 0
+        self.tick = 0
+        self.dead = False
+        self.cleared = False  # 闯关模式：达到目标分数
+        self.timed_out = False  # 闯关模式：时间耗尽（由外部计时设置）
+
+        # 本帧发生的事件（供界面播放音效等）
+        self.ate = False
+        self.evolved = False
+        # 上一帧的蛇尾位置（界面在两帧之间插值绘制时使用）
+        self.prev_tail = self.body.tail
+
+        # 进化模式状态
+        self.stage = 0
+        self.food_eaten = 0
+        self.effects: List[dict] = []
+
+    @property
+    def over(self) -> bool:
+        """本局是否已结束（死亡/通关/超时）"""
+        return self.dead or self.cleared or self.timed_out
+
+    def clone(self) -> "SimState":
+        """复制当前状态（用于搜索和回放）"""
+        other = SimState.__new__(SimState)
+        other.__dict__.update(self.__dict__)
+        other.rng = random.Random()
+        other.rng.setstate(self.rng.getstate())
+        other.body = self.body.clone()
+        other.free_cells = other.body.free_cells
+        other.effects = [dict(e) for e in self.effects]
+        return other
+
+
+def new_game(mode: str, width: int, height: int, obstacles=None,
+             score_target: int = 0, seed: Optional[int] = None,
+             blocked: Optional[bytes] = None) -> SimState:
+    """按屏幕像素尺寸创建一局新游戏并放置第一个食物"""
+    state = SimState(mode, width // CELL_SIZE, height // CELL_SIZE,
+                     obstacles=obstacles, score_target=score_target, seed=seed, blocked=blocked)
+    place_food(state)
+    return state
+
+
+def cell_rect(cell: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    """格子坐标转换为像素矩形(x, y, w, h)"""
+    return cell[0] * CELL_SIZE, cell[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE
+
+
+def in_bounds(state: SimState, cell: Tuple[int, int]) -> bool:
+    return 0 <= cell[0] < state.cols and 0 <= cell[1] < state.rows
+
+
+def hits_obstacle(state: SimState, cell: Tuple[int, int]) -> bool:
+    """判断格子是否与障碍物重叠（查障碍物掩码）"""
+    x, y = cell
+    return 0 <= x < state.cols and 0 <= y < state.rows and state.blocked[y * state.cols + x] == 1
+
+
+def is_free(state: SimState, cell: Tuple[int, int]) -> bool:
+    """格子是否可走（在屏幕内、未被蛇身占据、不是障碍物），供AI查询使用"""
+    return in_bounds(state, cell) and not state.body.occupied(cell) and not hits_obstacle(state, cell)
+
+
+def place_food(state: SimState):
+    """从空闲格子索引中随机放置食物（避开蛇身和障碍物），无空位时食物为None"""
+    cell = state.free_cells.pick(state.rng)
+    state.food = None if cell is None else (cell % state.cols, cell // state.cols)
+
+
+def change_direction(state: SimState, direction: Optional[int]):
+    """改变方向（不能直接掉头）"""
+    if direction is None or direction == OPPOSITE[state.direction]:
+        return
+    state.direction = direction
+
+
+def has_effect(state: SimState, effect_type: str) -> bool:
+    return any(effect["type"] == effect_type for effect in state.effects)
+
+
+def evolution_speed(state: SimState) -> int:
+    """进化模式当前速度（考虑加速效果）"""
+    base_speed = EVOLUTION_STAGES[state.stage]["speed"]
+    return base_speed + 4 if has_effect(state, "speed_boost") else base_speed
+
+
+def _check_evolution(state: SimState) -> bool:
+    """达到下一阶段要求时进化，并立即获得新阶段的能力效果"""
+    if state.stage >= len(EVOLUTION_STAGES) - 1:
+        return False
+    if state.food_eaten < EVOLUTION_STAGES[state.stage + 1]["food_required"]:
+        return False
+    state.stage += 1
+    state.food_eaten = 0
+    ability = EVOLUTION_STAGES[state.stage]["ability"]
+    if ability in ABILITY_EFFECTS:
+        effect_type, timer = ABILITY_EFFECTS[ability]
+        state.effects.append({"name": ability, "timer": timer, "type": effect_type})
+    return True
+
+
+def _update_effects(state: SimState):
+    for effect in state.effects[:]:
+        effect["timer"] -= 1
+        if effect["timer"] <= 0:
+            state.effects.remove(effect)
+
+
+def _advance_head(state: SimState) -> Tuple[int, int]:
+    dx, dy = DIRECTION_VECTORS[state.direction]
+    head = state.body.head
+    new_head = (head[0] + dx, head[1] + dy)
+    state.body.move(new_head)
+    state.score += TICK_SCORE
+    return new_head
+
+
+def _eat_or_shrink(state: SimState, head: Tuple[int, int]) -> bool:
+    """吃到食物则增长并重新放置食物，否则移除尾部"""
+    if head == state.food:
+        state.score += FOOD_SCORE
+        place_food(state)
+        return True
+    state.body.remove_tail()
+    return False
+
+
+def _is_self_or_wall_dead(state: SimState) -> bool:
+    return not in_bounds(state, state.body.head) or state.body.head_collides()
+
+
+def step(state: SimState, action: Optional[int] = None) -> SimState:
+    """推进一帧游戏规则，action为新方向（None表示保持）
+
+    为了速度直接在state上修改并返回它，需要保留旧状态时先调用state.clone()。
+    """
+    state.ate = False
+    state.evolved = False
+    if state.over:
+        return state
+
+    change_direction(state, action)
+    state.tick += 1
+    state.prev_tail = state.body.tail
+
+    if state.mode == MODE_LEVEL:
+        head = _advance_head(state)
+        # 撞墙直接结束本帧
+        if not in_bounds(state, head):
+            state.dead = True
+            return state
+        state.ate = _eat_or_shrink(state, head)
+        if hits_obstacle(state, head):
+            state.dead = True
+        elif state.score >= state.score_target:
+            state.cleared = True
+        return state
+
+    head = _advance_head(state)
+    state.ate = _eat_or_shrink(state, head)
+
+    if state.mode == MODE_EVOLUTION:
+        if state.ate:
+            state.food_eaten += 1
+            state.evolved = _check_evolution(state)
+        # 无敌状态下不判定死亡
+        if not has_effect(state, "invincible"):
+            state.dead = _is_self_or_wall_dead(state)
+        _update_effects(state)
+    else:
+        state.dead = _is_self_or_wall_dead(state)
+    return state
+
+
+def interpolated_cells(state: SimState, alpha: float) -> List[Tuple[float, float]]:
+    """上一帧与当前帧之间的蛇身位置（alpha为0~1，0为上一帧，1为当前帧）
+
+    每一节上一帧的位置就是它后面一节现在的位置，最后一节上一帧在prev_tail，
+    因此只需多记录一个格子即可插值，不必保存整条旧蛇身。
+    """
+    cells = list(state.body)
+    if alpha >= 1.0 or state.tick == 0:
+        return [(float(x), float(y)) for x, y in cells]
+    previous = cells[1:] + [state.prev_tail]
+    return [(px + (x - px) * alpha, py + (y - py) * alpha)
+            for (x, y), (px, py) in zip(cells, previous)]
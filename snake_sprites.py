@@ -0,0 +1,78 @@
+# snake_sprites.py - 预渲染的蛇身格子图块：每种颜色/阶段只画一次，绘制时整条蛇一次blits
+import random
+
+import pygame
+
+import themes
+from simulation import CELL_SIZE
+
+# 图块四周留出的透明边距（火焰、闪电效果会超出格子2像素）
+PAD = 2
+# 格子边框颜色（屏幕没有alpha通道，原来的(180, 200, 220, 30)实际就是不透明的这个颜色）
+BORDER_COLOR = (180, 200, 220)
+# 预先烘焙的闪电火花位置数量
+NOISE_VARIANTS = 8
+
+# (种类, 颜色, 参数...) -> Surface
+_sprites = {}
+
+
+def _new_sprite():
+    return pygame.Surface((CELL_SIZE + PAD * 2, CELL_SIZE + PAD * 2), pygame.SRCALPHA)
+
+
+def _cell_rect():
+    return pygame.Rect(PAD, PAD, CELL_SIZE, CELL_SIZE)
+
+
+def segment_sprite(color, radius, border=True):
+    """普通格子：圆角填充，可选1像素边框"""
+    key = ("segment", tuple(color), radius, border)
+    sprite = _sprites.get(key)
+    if sprite is None:
+        sprite = _sprites[key] = _new_sprite()
+        pygame.draw.rect(sprite, color, _cell_rect(), 0, radius)
+        if border:
+            pygame.draw.rect(sprite, BORDER_COLOR, _cell_rect(), 1, 2)
+    return sprite
+
+
+def evolved_head_sprite(stage, variant=0, border=True):
+    """进化模式蛇头（stage为EVOLUTION_STAGES中的一项）：火焰蛇带火焰外框，雷霆蛇带闪电火花（火花位置按variant预先生成）"""
+    name, color = stage["name"], stage["color"]
+    variant = variant % NOISE_VARIANTS if name == "雷霆蛇" else 0
+    key = ("head", tuple(color), name, variant, border)
+    sprite = _sprites.get(key)
+    if sprite is None:
+        sprite = _sprites[key] = _new_sprite()
+        rect = _cell_rect()
+        pygame.draw.rect(sprite, color, rect, 0, 5)
+        if name == "火焰蛇":
+            pygame.draw.rect(sprite, (255, 150, 0), rect.inflate(4, 4), 2, 5)
+        elif name == "雷霆蛇":
+            # 用variant作种子，同一个variant的火花位置固定
+            rng = random.Random(variant)
+            for _ in range(3):
+                spark = (rect.x + rng.randint(0, rect.width), rect.y + rng.randint(0, rect.height))
+                pygame.draw.circle(sprite, (255, 255, 0), spark, 2)
+        if border:
+            pygame.draw.rect(sprite, BORDER_COLOR, rect, 1, 2)
+    return sprite
+
+
+def clear_sprite_cache():
+    """清空图块缓存（切换主题后调用）"""
+    _sprites.clear()
+
+
+# 旧主题颜色的蛇身图块不再使用
+themes.subscribe(lambda theme_name: clear_sprite_cache())
+
+
+def draw_segments(screen, rects, head, body):
+    """用一次Surface.blits绘制整条蛇：rects[0]为蛇头，其余格子都用body图块"""
+    if not rects:
+        return
+    blits = [(head, (rects[0].x - PAD, rects[0].y - PAD))]
+    blits.extend((body, (rect.x - PAD, rect.y - PAD)) for rect in rects[1:])
+    screen.blits(blits, doreturn=False)
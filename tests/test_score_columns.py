@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import score_manage
+
+# 故意不按分数排序：两种读取方式都必须保持文件中的先后顺序
+LINES = [
+    "30,12,2025-09-01 10:00:00",
+    "90,40,2025-09-01 11:00:00",
+    "bad line",
+    "60,25,2025-09-02 09:30:00,1f",
+    "120,55,2025-09-03 20:15:00",
+    "10,5,2025-09-04 08:00:00",
+]
+
+
+@pytest.fixture
+def scores_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / score_manage.SCORES_FILE).write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    monkeypatch.setattr(score_manage, "_score_store", None)
+    yield tmp_path
+    if score_manage._score_store is not None:
+        score_manage._score_store.close()
+
+
+def test_store_and_text_fallback_agree(scores_dir, monkeypatch):
+    from_store = score_manage.get_score_columns()
+    monkeypatch.setattr(score_manage, "get_score_store", lambda: None)
+    from_text = score_manage.get_score_columns()
+    assert from_text.score.tolist() == [30, 90, 60, 120, 10]
+    for field in from_store._fields:
+        np.testing.assert_array_equal(getattr(from_text, field), getattr(from_store, field))
+        assert getattr(from_text, field).dtype == getattr(from_store, field).dtype
+
+
+def test_text_fallback_without_scores_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(score_manage, "get_score_store", lambda: None)
+    columns = score_manage.get_score_columns()
+    assert all(len(column) == 0 for column in columns)
+
+
+def test_longest_run():
+    scores = np.array([30, 90, 60, 120, 130, 140, 10])
+    assert score_manage.longest_run(scores[1:] > scores[:-1]) == 3
+    assert score_manage.longest_run(np.array([], dtype=bool)) == 0
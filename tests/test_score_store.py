@@ -0,0 +1,67 @@
+import os
+import random
+
+import pytest
+
+from score_store import INDEX_MERGE_THRESHOLD, ScoreStore
+
+COUNT = INDEX_MERGE_THRESHOLD * 2
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {"path": str(tmp_path / "scores.bin"), "score_index": str(tmp_path / "scores.by_score.idx"),
+            "date_index": str(tmp_path / "scores.by_date.idx")}
+
+
+@pytest.fixture
+def records(paths):
+    rng = random.Random(1)
+    records = [(rng.randrange(1000), rng.randrange(600), 1_700_000_000 + rng.randrange(10 ** 7), 1)
+               for _ in range(COUNT)]
+    store = ScoreStore(**paths)
+    store.append_many(records)
+    store.close()
+    return records
+
+
+def _check_queries(store, records):
+    assert len(store.indexes["score"]) == len(store.indexes["date"]) == len(records)
+    # 查询完全走索引，没有需要临时排序的尾部
+    assert store._tail_entries("score") == [] and store._tail_entries("date") == []
+    by_score = sorted(range(len(records)), key=lambda i: (-records[i][0], i))
+    assert store.top(10) == [records[i] for i in by_score[:10]]
+    lo, hi = 1_700_000_000, 1_700_000_000 + 10 ** 6
+    expected = sorted((r for r in records if lo <= r[2] < hi), key=lambda r: r[2])
+    assert [r[2] for r in store.date_range(lo, hi)] == [r[2] for r in expected]
+
+
+def test_truncated_index_is_rebuilt(paths, records):
+    with open(paths["score_index"], "r+b") as f:
+        f.truncate(os.path.getsize(paths["score_index"]) - 7)
+    store = ScoreStore(**paths)
+    try:
+        _check_queries(store, records)
+    finally:
+        store.close()
+
+
+def test_garbage_index_is_rebuilt(paths, records):
+    size = os.path.getsize(paths["date_index"])
+    with open(paths["date_index"], "r+b") as f:
+        f.seek(4)
+        f.write(b"\xff" * (size - 4))
+    store = ScoreStore(**paths)
+    try:
+        _check_queries(store, records)
+    finally:
+        store.close()
+
+
+def test_missing_index_is_rebuilt(paths, records):
+    os.remove(paths["score_index"])
+    store = ScoreStore(**paths)
+    try:
+        _check_queries(store, records)
+    finally:
+        store.close()
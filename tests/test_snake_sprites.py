@@ -0,0 +1,39 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from simulation import EVOLUTION_STAGES
+from snake_sprites import NOISE_VARIANTS, evolved_head_sprite
+
+
+def _pixels(surface):
+    return pygame.image.tobytes(surface, "RGBA")
+
+
+def _stage(name):
+    return next(stage for stage in EVOLUTION_STAGES if stage["name"] == name)
+
+
+def _plain_head(stage):
+    """没有特效的进化蛇头（同样的颜色）"""
+    return _pixels(evolved_head_sprite(dict(stage, name="幼蛇")))
+
+
+def test_fire_head_has_flame_outline():
+    stage = _stage("火焰蛇")
+    assert _pixels(evolved_head_sprite(stage)) != _plain_head(stage)
+
+
+def test_thunder_head_has_spark_variants():
+    stage = _stage("雷霆蛇")
+    variants = {_pixels(evolved_head_sprite(stage, i)) for i in range(NOISE_VARIANTS)}
+    assert _plain_head(stage) not in variants
+    assert len(variants) > 1
+
+
+def test_other_stages_share_one_head():
+    stage = _stage("神龙")
+    heads = {id(evolved_head_sprite(stage, i)) for i in range(NOISE_VARIANTS)}
+    assert len(heads) == 1
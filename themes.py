@@ -66,6 +66,20 @@ def save_theme_settings():
 
 # 初始化当前主题
 CURRENT_THEME = load_theme_settings()
+# 主题切换时的回调函数列表，回调参数为新主题名称
+_subscribers = []
+
+
+def subscribe(callback):
+    """注册主题切换回调（颜色和按主题生成的缓存只在切换时刷新，不必每帧读取）"""
+    if callback not in _subscribers:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
 
 def get_current_theme():
     """获取当前主题颜色"""
@@ -77,6 +91,8 @@ def set_theme(theme_name):
     if theme_name in THEMES:
         CURRENT_THEME = theme_name
         save_theme_settings()
+        for callback in list(_subscribers):
+            callback(theme_name)
         print(f"主题已切换到: {THEMES[theme_name]['name']}")
         return True
     return False
\ No newline at end of file
@@ -45,3 +45,62 @@ class TimeManager:
         """获取游戏结束的时间字符串"""
         import datetime
         return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class FixedTimestep:
+    """固定步长的模拟时钟：按tick_rate累积时间，每帧返回需要推进的模拟帧数
+
+    画面按显示器刷新率绘制，模拟速度只由tick_rate决定，与绘制耗时无关。
+    一帧内需要补跑多个模拟帧时，补跑的帧记为延迟帧(late_ticks)；
+    超过max_ticks_per_frame的部分直接丢弃，记为丢弃帧(dropped_ticks)，避免卡顿后越追越慢。
+    """
+
+    def __init__(self, tick_rate, max_ticks_per_frame=5):
+        self.step = 1.0 / tick_rate
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+        self.ticks = 0
+        self.late_ticks = 0
+        self.dropped_ticks = 0
+
+    def set_rate(self, tick_rate):
+        """修改模拟速度（每秒帧数）"""
+        self.step = 1.0 / tick_rate
+
+    def reset(self):
+        """重新开始计时（新开一局或暂停恢复时调用，暂停期间的时间不计入）"""
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+        self.ticks = 0
+        self.late_ticks = 0
+        self.dropped_ticks = 0
+
+    def resume(self):
+        """暂停恢复：不计入暂停期间的时间，保留统计和帧内进度"""
+        self.last_time = time.perf_counter()
+
+    def advance(self):
+        """累积距上次调用的时间，返回本帧应推进的模拟帧数"""
+        now = time.perf_counter()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        due = int(self.accumulator // self.step)
+        self.accumulator -= due * self.step
+        if due > 1:
+            self.late_ticks += due - 1
+        if due > self.max_ticks_per_frame:
+            self.dropped_ticks += due - self.max_ticks_per_frame
+            due = self.max_ticks_per_frame
+        self.ticks += due
+        return due
+
+    @property
+    def alpha(self):
+        """距下一个模拟帧的进度（0~1），用于在两帧之间插值绘制"""
+        return min(1.0, self.accumulator / self.step)
+
+    def get_stats(self):
+        """获取模拟帧统计（总帧数、延迟帧、丢弃帧）"""
+        return {"ticks": self.ticks, "late_ticks": self.late_ticks, "dropped_ticks": self.dropped_ticks}
@@ -1,17 +1,101 @@
+from collections import OrderedDict
+
 import pygame
 
+import themes
+
+# 默认字体文件（加载失败时回退到系统字体）
+DEFAULT_FONT = "souces/simfang.ttf"
+FALLBACK_FONTS = ["SimFang", "Microsoft YaHei", "Arial"]
+# 渲染好的文字图像最多缓存的条数（超出后淘汰最久未使用的）
+TEXT_CACHE_SIZE = 512
+# 半透明面板最多缓存的条数
+PANEL_CACHE_SIZE = 64
+
+# 全局字体表：(字体, 字号) -> Font，每种字体每个字号只创建一次
+_fonts = {}
+# 文字图像LRU缓存：(文字, 字号, 颜色, 抗锯齿) -> Surface
+_text_cache = OrderedDict()
+_text_cache_stats = {"hits": 0, "misses": 0}
+# 半透明面板LRU缓存：(宽, 高, 颜色) -> 已填充好颜色的SRCALPHA Surface
+_panel_cache = OrderedDict()
+
+
+def get_font(size, face=DEFAULT_FONT):
+    """按字体和字号获取Font对象；face为字体文件路径，或SysFont使用的字体名（列表）"""
+    key = (face if isinstance(face, str) else tuple(face), size)
+    font = _fonts.get(key)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        if face == DEFAULT_FONT:
+            try:
+                font = pygame.font.Font(face, size)
+            except:
+                font = pygame.font.SysFont(FALLBACK_FONTS, size)
+        else:
+            font = pygame.font.SysFont(face, size)
+        _fonts[key] = font
+    return font
+
+
+def render_text(text, font_size, color, antialias=True):
+    """渲染文字并缓存结果，相同的文字、字号和颜色直接复用之前的图像"""
+    key = (text, font_size, tuple(color), antialias)
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        _text_cache_stats["hits"] += 1
+        return surface
+    _text_cache_stats["misses"] += 1
+    surface = get_font(font_size).render(text, antialias, color)
+    _text_cache[key] = surface
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
+
+
+def get_text_cache_stats():
+    """文字缓存的命中/未命中次数和当前条数"""
+    return dict(_text_cache_stats, size=len(_text_cache))
+
+
+def get_panel(size, color):
+    """获取指定尺寸和颜色（可带alpha）的纯色面板，同样的面板只创建和填充一次"""
+    key = (int(size[0]), int(size[1]), tuple(color))
+    surface = _panel_cache.get(key)
+    if surface is not None:
+        _panel_cache.move_to_end(key)
+        return surface
+    surface = pygame.Surface(key[:2], pygame.SRCALPHA)
+    surface.fill(color)
+    _panel_cache[key] = surface
+    if len(_panel_cache) > PANEL_CACHE_SIZE:
+        _panel_cache.popitem(last=False)
+    return surface
+
+
+def draw_panel(screen, rect, color):
+    """在rect位置绘制半透明纯色面板（不含边框）"""
+    rect = pygame.Rect(rect)
+    screen.blit(get_panel(rect.size, color), rect.topleft)
+
+
+def clear_panel_cache():
+    """清空面板缓存（切换主题或窗口尺寸后调用）"""
+    _panel_cache.clear()
+
+
+# 旧主题颜色的面板不再使用
+themes.subscribe(lambda theme_name: clear_panel_cache())
+
 
 def show_text(screen, pos, text, color, is_center=True, font_size=30):
     # 如果颜色为None，使用默认颜色
     if color is None:
         color = (50, 70, 90)  # 默认文字颜色
 
-    pygame.font.init()
-    try:
-        font = pygame.font.Font("souces/simfang.ttf", font_size)
-    except:
-        font = pygame.font.SysFont(["SimFang", "Microsoft YaHei", "Arial"], font_size)
-    text_surface = font.render(text, True, color)
+    text_surface = render_text(text, font_size, color)
     text_rect = text_surface.get_rect()
     if is_center:
         text_rect.center = pos